@@ -8,6 +8,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <ctype.h>
+#include <string.h>
 #include <time.h>
 
 #define MAX_ROW     100
@@ -27,9 +28,13 @@
 #define WEST          2
 #define SOUTH         3
 
-//#define SPROUT
-#define SPARSE
-//#define TREE
+// generation styles (chosen on the command line)
+#define DENSE         0
+#define SPARSE        1
+#define TREE          2
+
+int style  = SPARSE; // how far a new bridge may extend
+int sprout = FALSE;  // only start new bridges from existing islands
 
 /************************************************************
    Print the input map in character format.
@@ -104,11 +109,8 @@ int add_bridge(
     do {
       r = random() % nrow;
       c = random() % ncol;
-#ifdef SPROUT
-    } while( map[r][c] == 0 );
-#else
-    } while( dirn[r][c] == NONE && map[r][c] == 0 );
-#endif
+    } while( sprout ? map[r][c] == 0
+                    : dirn[r][c] == NONE && map[r][c] == 0 );
     if( island_neighbor(r,c,nrow,ncol,map)) {
       return( FALSE );
     }
@@ -127,15 +129,14 @@ int add_bridge(
     while( c < ncol-1 && dirn[r][c] == NONE && map[r][c] == 0 ) {
       c++;
     }
-#ifdef SPARSE
-    if( dirn[r][c] != NONE ) {
+    if( style == SPARSE ) {
+      if( dirn[r][c] != NONE ) {
+        c--;
+      }
+    }
+    else if( style == TREE ) {
       c--;
     }
-#else
-#ifdef TREE
-    c--;
-#endif
-#endif
     if( c < c0+2 ) {    // too short
       return( FALSE );
     }
@@ -156,15 +157,14 @@ int add_bridge(
     while( r > 0 && dirn[r][c] == NONE && map[r][c] == 0 ) {
       r--;
     }
-#ifdef SPARSE
-    if( dirn[r][c] != NONE ) {
+    if( style == SPARSE ) {
+      if( dirn[r][c] != NONE ) {
+        r++;
+      }
+    }
+    else if( style == TREE ) {
       r++;
     }
-#else
-#ifdef TREE
-    r++;
-#endif
-#endif
     if( r > r1-2 ) {
       return( FALSE );
     }
@@ -185,15 +185,14 @@ int add_bridge(
     while( c > 0 && dirn[r][c] == NONE && map[r][c] == 0 ) {
       c--;
     }
-#ifdef SPARSE
-    if( dirn[r][c] != NONE ) {
+    if( style == SPARSE ) {
+      if( dirn[r][c] != NONE ) {
+        c++;
+      }
+    }
+    else if( style == TREE ) {
       c++;
     }
-#else
-#ifdef TREE
-    c++;
-#endif
-#endif
     if( c > c1-2 ) {
       return( FALSE );
     }
@@ -214,15 +213,14 @@ int add_bridge(
     while( r < nrow-1 && dirn[r][c] == NONE && map[r][c] == 0 ) {
       r++;
     }
-#ifdef SPARSE
-    if( dirn[r][c] != NONE ) {
+    if( style == SPARSE ) {
+      if( dirn[r][c] != NONE ) {
+        r--;
+      }
+    }
+    else if( style == TREE ) {
       r--;
     }
-#else
-#ifdef TREE
-    r--;
-#endif
-#endif
     if( r < r0+2 ) {
       return( FALSE );
     }
@@ -273,12 +271,15 @@ int main( int argc, char *argv[] )
   int nrow, ncol;
   int nfail;
   int r,c;
+  unsigned int seed;
 
   if( argc < 2 || !isdigit(argv[1][0])) {
-    printf("Usage: %s <nrow> [ncol]\n",argv[0]);
+    printf("Usage: %s <nrow> [ncol] [seed] [style]\n",argv[0]);
     printf("Generate a random Hashi puzzle of size nrow x ncol;\n");
     printf("can be run repeatedly, producing different puzzles each time;\n");
     printf("ncol defaults to nrow.\n");
+    printf("A seed makes the puzzle repeatable (default: the current time).\n");
+    printf("The style is sparse (default), tree, dense or sprout.\n");
     return 0;
   }
   else {
@@ -302,7 +303,32 @@ int main( int argc, char *argv[] )
   if( ncol > MAX_COL ) {
     ncol = MAX_COL;
   }
-  srandom(time(NULL));
+  if( argc > 3 ) {
+    seed = (unsigned int) strtoul( argv[3], NULL, 10 );
+  }
+  else {
+    seed = (unsigned int) time(NULL);
+  }
+  if( argc > 4 ) {
+    if( strcmp( argv[4], "sparse" ) == 0 ) {
+      style = SPARSE;
+    }
+    else if( strcmp( argv[4], "tree" ) == 0 ) {
+      style = TREE;
+    }
+    else if( strcmp( argv[4], "dense" ) == 0 ) {
+      style = DENSE;
+    }
+    else if( strcmp( argv[4], "sprout" ) == 0 ) {
+      style  = SPARSE;
+      sprout = TRUE;
+    }
+    else {
+      printf("Unknown style: %s\n", argv[4] );
+      return 1;
+    }
+  }
+  srandom( seed );
 
   for( r=0; r < nrow; r++ ) {
     for( c=0; c < ncol; c++ ) {
@@ -0,0 +1,324 @@
+# cdcl.py
+import heapq
+import time
+
+def luby(i):
+    """
+    Returns the i-th term (from 1) of the Luby sequence 1 1 2 1 1 2 4 ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+class Solver:
+    """
+    Conflict-driven clause learning SAT solver.
+
+    Variables are numbered 1..num_vars and clauses are given as lists of
+    non-zero integers, as in DIMACS (-v is the negation of v). Internally
+    the literal v is 2v and -v is 2v+1, so that a literal's negation is
+    lit ^ 1 and literals can index flat lists.
+
+    Unit propagation uses two watched literals per clause; a conflict is
+    analysed back to its first unique implication point and the learnt
+    clause is added, with a non-chronological backjump. Branching picks the
+    unassigned variable of highest activity (VSIDS), bumped for every
+    variable taking part in a conflict, with the last polarity it had
+    (phase saving). The search restarts on a Luby schedule, and the
+    learnt clauses of high LBD are pruned as their number grows.
+    """
+
+    RESTART_BASE = 100  # conflicts per unit of the Luby sequence
+    DECAY = 0.95        # VSIDS activity decay per conflict
+    CHECK_INTERVAL = 256  # decisions between reads of the clock
+
+    def __init__(self, num_vars):
+        self.num_vars = num_vars
+        n = 2 * num_vars + 2
+        self.lit_value = [-1] * n   # 1 true, 0 false, -1 unassigned
+        self.watches = [[] for _ in range(n)]
+        self.level = [0] * (num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.activity = [0.0] * (num_vars + 1)
+        self.polarity = [1] * (num_vars + 1)  # 1: try the negative literal first
+        self.seen = [False] * (num_vars + 1)
+        self.var_inc = 1.0
+        self.heap = [(0.0, v) for v in range(1, num_vars + 1)]
+
+        self.trail = []      # assigned literals, in order
+        self.trail_lim = []  # trail position at the start of each level
+        self.qhead = 0       # next trail position to propagate
+        self.learnts = []    # learnt clauses, each as (lbd, clause)
+        self.max_learnts = 1000
+        self.ok = True       # False once a conflict is found at level 0
+
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+        self.restarts = 0
+
+    def add_clause(self, clause):
+        """
+        Adds a clause of DIMACS literals before solving. Returns False if the
+        clauses are already known to be unsatisfiable.
+        """
+        lits = []
+        for x in clause:
+            lit = 2 * x if x > 0 else -2 * x + 1
+            value = self.lit_value[lit]
+            if value == 1 or lit ^ 1 in lits:
+                return True  # satisfied at level 0, or a tautology
+            if value == -1 and lit not in lits:
+                lits.append(lit)
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.enqueue(lits[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(lits)
+        return self.ok
+
+    def attach(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, lit, reason):
+        v = lit >> 1
+        self.lit_value[lit] = 1
+        self.lit_value[lit ^ 1] = 0
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Propagates the literals on the trail. Returns a conflicting clause,
+        or None. The implied literal of a reason clause is its first one.
+        """
+        lit_value = self.lit_value
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            watching = watches[false_lit]
+            kept = []
+            for n, clause in enumerate(watching):
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if lit_value[first] == 1:
+                    kept.append(clause)
+                    continue
+                # Look for another literal to watch instead of false_lit
+                for k in range(2, len(clause)):
+                    if lit_value[clause[k]] != 0:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if lit_value[first] == 0:
+                        kept.extend(watching[n + 1:])
+                        watches[false_lit] = kept
+                        return clause
+                    self.enqueue(first, clause)
+            watches[false_lit] = kept
+        return None
+
+    def bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            for u in range(1, self.num_vars + 1):
+                self.activity[u] *= 1e-100
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.num_vars + 1)
+                         if self.lit_value[2 * u] == -1]
+            heapq.heapify(self.heap)
+        elif self.lit_value[2 * v] == -1:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def analyze(self, conflict):
+        """
+        Derives the first-UIP clause of a conflict. Returns the learnt clause,
+        with the asserting literal first and a literal of the backjump level
+        second, and the level to backjump to.
+        """
+        seen = self.seen
+        level = self.level
+        current = len(self.trail_lim)
+        learnt = [None]
+        counter = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                v = q >> 1
+                if not seen[v] and level[v] > 0:
+                    seen[v] = True
+                    self.bump(v)
+                    if level[v] >= current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while not seen[self.trail[index] >> 1]:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            clause = self.reason[lit >> 1]
+            seen[lit >> 1] = False
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = lit ^ 1
+
+        # Drop literals implied by the others (local minimisation)
+        minimised = [learnt[0]]
+        for q in learnt[1:]:
+            reason = self.reason[q >> 1]
+            if reason is None or any(not seen[r >> 1] and level[r >> 1] > 0 for r in reason[1:]):
+                minimised.append(q)
+        for q in learnt:
+            seen[q >> 1] = False
+        learnt = minimised
+
+        backjump = 0
+        if len(learnt) > 1:
+            k = max(range(1, len(learnt)), key=lambda k: level[learnt[k] >> 1])
+            learnt[1], learnt[k] = learnt[k], learnt[1]
+            backjump = level[learnt[1] >> 1]
+        return learnt, backjump
+
+    def cancel_until(self, target):
+        """
+        Undoes every assignment above the given decision level.
+        """
+        if len(self.trail_lim) <= target:
+            return
+        lit_value = self.lit_value
+        for lit in self.trail[self.trail_lim[target]:]:
+            v = lit >> 1
+            lit_value[lit] = -1
+            lit_value[lit ^ 1] = -1
+            self.reason[v] = None
+            self.polarity[v] = lit & 1
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.trail_lim[target]:]
+        del self.trail_lim[target:]
+        self.qhead = len(self.trail)
+
+    def pick_branch(self):
+        """
+        Returns the decision literal for the most active unassigned
+        variable, or None if every variable is assigned.
+        """
+        heap = self.heap
+        while heap:
+            activity, v = heapq.heappop(heap)
+            if self.lit_value[2 * v] == -1 and -activity == self.activity[v]:
+                return 2 * v + self.polarity[v]
+        for v in range(1, self.num_vars + 1):
+            if self.lit_value[2 * v] == -1:
+                return 2 * v + self.polarity[v]
+        return None
+
+    def reduce_learnts(self):
+        """
+        Forgets the half of the learnt clauses with the highest LBD (number
+        of decision levels they span), keeping binary and glue clauses and
+        those that are the reason for a current assignment.
+        """
+        self.learnts.sort(key=lambda entry: entry[0])
+        keep = len(self.learnts) // 2
+        kept = []
+        removed = set()
+        for n, (lbd, clause) in enumerate(self.learnts):
+            locked = self.reason[clause[0] >> 1] is clause and self.lit_value[clause[0]] == 1
+            if n < keep or lbd <= 2 or len(clause) == 2 or locked:
+                kept.append((lbd, clause))
+            else:
+                removed.add(id(clause))
+        self.learnts = kept
+        for lit in range(2, len(self.watches)):
+            self.watches[lit] = [c for c in self.watches[lit] if id(c) not in removed]
+
+    def solve(self, deadline=None):
+        """
+        Returns True if the clauses are satisfiable, with the assignment
+        available from model(), or False. With a deadline (a time.monotonic()
+        value), returns None if it passes before the answer is known.
+        """
+        if not self.ok:
+            return False
+        restart = 1
+        limit = self.RESTART_BASE * luby(restart)
+        since_restart = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, backjump = self.analyze(conflict)
+                self.cancel_until(backjump)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    lbd = len({self.level[lit >> 1] for lit in learnt})
+                    self.attach(learnt)
+                    self.learnts.append((lbd, learnt))
+                    self.enqueue(learnt[0], learnt)
+                self.var_inc /= self.DECAY
+
+                if since_restart >= limit:
+                    self.restarts += 1
+                    restart += 1
+                    limit = self.RESTART_BASE * luby(restart)
+                    since_restart = 0
+                    self.cancel_until(0)
+                if len(self.learnts) >= self.max_learnts:
+                    self.reduce_learnts()
+                    self.max_learnts = int(self.max_learnts * 1.1)
+            else:
+                lit = self.pick_branch()
+                if lit is None:
+                    return True
+                self.decisions += 1
+                if deadline is not None and self.decisions % self.CHECK_INTERVAL == 0 \
+                   and time.monotonic() > deadline:
+                    self.cancel_until(0)
+                    return None
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(lit, None)
+
+    def model(self):
+        """
+        Returns the satisfying assignment as a list indexed by variable
+        (entry 0 unused) of True / False.
+        """
+        return [False] + [self.lit_value[2 * v] == 1 for v in range(1, self.num_vars + 1)]
+
+    def as_dict(self):
+        """
+        Returns the solver counters as a dictionary ready to be written as JSON.
+        """
+        return {'variables': self.num_vars, 'decisions': self.decisions,
+                'conflicts': self.conflicts, 'propagations': self.propagations,
+                'restarts': self.restarts, 'learnts': len(self.learnts)}
+
+    def report(self):
+        """
+        Returns the solver counters as lines of text.
+        """
+        return ['%-13s %d' % (name + ':', count) for name, count in self.as_dict().items()]
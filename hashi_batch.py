@@ -0,0 +1,186 @@
+#************************************************************
+#   hashi_batch.py
+#   Solve many hashi puzzles in one run, spread over a pool of
+#   worker processes, writing one JSON line per puzzle:
+#
+#   python3 hashi_batch.py puzzles/            every file in a directory
+#   python3 hashi_batch.py corpus.txt          puzzles separated by blank lines
+#   cat corpus.txt | python3 hashi_batch.py    the same, from stdin
+#
+#   Each line holds the puzzle name, its status (solved, unsolvable,
+#   timeout or error), the solution rows, the wall time in seconds,
+#   and the numbers of search nodes and of pruned assignments; an
+#   error line also holds the error, e.g. why a file could not be
+#   parsed. With --timeout, the search is given a deadline, which it
+#   checks every hashi_search.CHECK_INTERVAL nodes, so a puzzle that
+#   runs too long is reported as a timeout with the nodes searched so
+#   far. With --cache, solutions are also looked up in and added to a
+#   solution cache; each line says whether the puzzle was a cache hit,
+#   and the totals are printed to stderr.
+#   With --stats, each line also holds the search counters (see
+#   hashi_search.SearchStats). With --table N, each search remembers
+#   up to 2N failed states (see hashi_search.search). With --count N,
+#   the solutions of each puzzle are counted instead, up to N: the
+#   status is unique, multiple (N or more with N = 2) or unsolvable,
+#   and the line holds the count.
+#
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import hashi_search
+from hashi_cache import SolutionCache
+from hashi_solver import check_search_args, format_solution
+from scan_print_map import scan_maps
+
+# Solution cache of this (worker) process, opened by open_cache
+cache = None
+
+def open_cache(path):
+    global cache
+    if path is not None:
+        cache = SolutionCache(path)
+
+def read_puzzles(paths):
+    """
+    Yields (name, map) for every puzzle in the given files and directories,
+    or on stdin if there are none. A file may hold several puzzles separated
+    by blank lines; these are named file#1, file#2, ... For a file or
+    directory that cannot be read or parsed, the map is the OSError or
+    ValueError raised; on stdin, reading stops at the first puzzle that
+    cannot be parsed.
+    """
+    if not paths:
+        k = 0
+        try:
+            for k, (nrow, ncol, map) in enumerate(scan_maps(sys.stdin), 1):
+                yield 'stdin#%d' % k, map
+        except ValueError as e:
+            yield 'stdin#%d' % (k + 1), e
+        return
+    for path in paths:
+        if os.path.isdir(path):
+            try:
+                names = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+            except OSError as e:
+                yield path, e
+                continue
+            names = [name for name in names if os.path.isfile(name)]
+        else:
+            names = [path]
+        for name in names:
+            try:
+                with open(name, 'rb') as f:
+                    puzzles = list(scan_maps(f))
+            except (OSError, ValueError) as e:
+                yield name, e
+                continue
+            for k, (nrow, ncol, map) in enumerate(puzzles):
+                yield (name if len(puzzles) == 1 else '%s#%d' % (name, k + 1)), map
+
+def solve_puzzle(task):
+    """
+    Solves one puzzle, giving up after `timeout` seconds (0 for no limit);
+    the search checks the time every hashi_search.CHECK_INTERVAL nodes.
+    Each search keeps a transposition table of `table_size` slots (0 for
+    none). With a count, counts its solutions up to that many instead,
+    bypassing the cache. Returns the result as a dictionary ready to be written as JSON.
+    """
+    name, map, ordering, timeout, collect_stats, count, table_size = task
+    result = {'name': name, 'status': None, 'solution': None, 'time': None, 'nodes': None,
+              'prunes': None}
+    if cache is not None and count is None:
+        result['cached'] = False
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+    state = None
+    stats = hashi_search.SearchStats() if collect_stats else None
+    try:
+        if isinstance(map, (OSError, ValueError)):
+            raise map  # the puzzle could not be read or parsed
+        if count is not None:
+            state, _ = hashi_search.make_state(map)
+            result['solutions'] = hashi_search.count_state(state, count, stats, deadline)
+            if result['solutions'] == 0:
+                result['status'] = 'unsolvable'
+            else:
+                result['status'] = 'unique' if result['solutions'] == 1 else 'multiple'
+        else:
+            bridges = None if cache is None else cache.get(map)
+            if bridges is not None:
+                result['cached'] = True
+            else:
+                state, island_degrees = hashi_search.make_state(map)
+                if hashi_search.solve_state(state, island_degrees, ordering, stats=stats, deadline=deadline,
+                                            table_size=table_size):
+                    bridges = state.bridges()
+                    if cache is not None:
+                        cache.put(map, bridges)
+            if bridges is not None:
+                result['status'] = 'solved'
+                result['solution'] = format_solution(map, bridges)
+            else:
+                result['status'] = 'unsolvable'
+    except hashi_search.SearchTimeout:
+        result['status'] = 'timeout'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    result['time'] = round(time.perf_counter() - start, 6)
+    if state is not None:
+        result['nodes'] = state.nodes
+        result['prunes'] = state.prunes
+    if stats is not None:
+        result['stats'] = stats.as_dict()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths',nargs='*',
+                        help='puzzle files or directories (default: stdin)')
+    parser.add_argument('--jobs',type=int,default=os.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--timeout',type=float,default=0,
+                        help='time limit per puzzle in seconds (0 for none)')
+    parser.add_argument('--order',type=str,default='dynamic',choices=('static','dynamic'),
+                        help='static or dynamic bridge ordering')
+    parser.add_argument('--cache',type=str,default=None,
+                        help='file of cached solutions, shared by the workers')
+    parser.add_argument('--stats',action='store_true',default=False,
+                        help='add the search counters to each line')
+    parser.add_argument('--count',type=int,default=None,
+                        help='count the solutions of each puzzle instead, stopping at this many (2 checks uniqueness)')
+    parser.add_argument('--table',type=int,default=0,
+                        help='slots of the table of failed states, a power of two (0 for none)')
+    args = parser.parse_args()
+    check_search_args(args)
+
+    tasks = ((name, map, args.order, args.timeout, args.stats, args.count, args.table)
+             for name, map in read_puzzles(args.paths))
+    hits = 0
+    misses = 0
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs, open_cache, (args.cache,))
+        results = pool.imap(solve_puzzle, tasks)
+    else:
+        pool = None
+        open_cache(args.cache)
+        results = map(solve_puzzle, tasks)
+    for result in results:
+        print(json.dumps(result), flush=True)
+        if result.get('cached'):
+            hits += 1
+        elif 'cached' in result:
+            misses += 1
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if args.cache is not None:
+        print('cache: %d hits, %d misses' % (hits, misses), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+#************************************************************
+#   hashi_bench.py
+#   Compare the number of search nodes and the time taken by
+#   two variants of the hashi solver on a set of puzzle files:
+#
+#   python3 hashi_bench.py --compare conflicts puzzles/*.in
+#       backtrack engine without / with the crossing conflict index
+#   python3 hashi_bench.py --compare order puzzles/*.in
+#       array engine with static / dynamic bridge ordering
+#   python3 hashi_bench.py --compare split puzzles/*.in
+#       array engine sequentially / with the top of the search tree
+#       split over one worker process per core, reporting
+#       the speedup
+#   python3 hashi_bench.py --compare backjump puzzles/*.in
+#       array engine with chronological backtracking / with
+#       conflict-directed backjumping and nogoods
+#   python3 hashi_bench.py --compare table puzzles/*.in
+#       array engine without / with the transposition table of
+#       unsolvable residual states
+#   python3 hashi_bench.py --compare engine puzzles/*.in
+#       array engine / CDCL SAT engine (nodes are decisions)
+#   python3 hashi_bench.py --compare identify [puzzles/*.in]
+#       check that identify_potential_bridges_np and _fast give the
+#       same results as identify_potential_bridges on edge cases
+#       (empty grids, border and isolated islands), the puzzles and
+#       random grids, and time them on the puzzles and random grids
+#
+#   Each variant gets --timeout seconds per puzzle (default 60, 0 for
+#   none); the node count of a run that timed out is shown after '>'.
+#
+#   It also keeps a fixed corpus of seeded puzzles, made by bridgen
+#   (gcc -O2 -o bridgen bridgen.c), and checks the solver against
+#   a stored baseline:
+#
+#   python3 hashi_bench.py --build-corpus corpus
+#       generate puzzles of every size in SIZES and style in STYLES,
+#       for each seed in SEEDS, as corpus/<style>_<size>_<seed>.in
+#   python3 hashi_bench.py --corpus corpus --save-baseline base.json
+#       solve every puzzle and record time, nodes, prunes and the peak
+#       memory of the (spawned) worker process that solved it
+#   python3 hashi_bench.py --corpus corpus --baseline base.json
+#       solve again and flag the puzzles that got slower, searched
+#       more, used more memory or stopped solving; exits with status 1
+#       if there are any
+#
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import time
+
+import numpy as np
+
+import hashi_batch
+import hashi_solver
+import hashi_sat
+import hashi_search
+from hashi_state import HashiState
+from scan_print_map import scan_map
+from identify_potential_bridges import identify_potential_bridges, identify_potential_bridges_fast, \
+                                       identify_potential_bridges_np
+
+def run_backtrack(map, use_conflicts, deadline=None):
+    """
+    Runs search_for_solution on a puzzle, returning (solved, nodes, seconds);
+    solved is None if the deadline (a time.monotonic() value) passed first.
+    """
+    nrow, ncol = map.shape
+    potential_bridges, island_degrees, conflicts = identify_potential_bridges(map)
+    potential_bridges, conflicts = hashi_solver.sort_bridges(potential_bridges, island_degrees, conflicts)
+    bridges = np.array([(b[0], b[1], b[2], 0) for b in potential_bridges], dtype=object)
+    island_bridge_counts = {(r, c): 0 for r in range(nrow) for c in range(ncol) if map[r, c] > 0}
+
+    hashi_solver.search_nodes = 0
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            solved = hashi_solver.search_for_solution(
+                map, bridges, island_bridge_counts,
+                conflicts=conflicts if use_conflicts else None, deadline=deadline)
+    except hashi_search.SearchTimeout:
+        solved = None
+    return solved, hashi_solver.search_nodes, time.perf_counter() - start
+
+def run_array(map, ordering, backjump=True, table_size=0, deadline=None):
+    """
+    Runs the array engine on a puzzle, returning (solved, nodes, seconds).
+    """
+    potential_bridges, island_degrees, conflicts = identify_potential_bridges(map)
+    state = HashiState(map, potential_bridges, conflicts)
+    start = time.perf_counter()
+    solved = state.is_feasible()
+    if solved:
+        order = hashi_search.static_order(state, island_degrees) if ordering == 'static' else None
+        try:
+            solved = hashi_search.search(state, order, backjump=backjump, table_size=table_size,
+                                         deadline=deadline)
+        except hashi_search.SearchTimeout:
+            solved = None
+    return solved, state.nodes, time.perf_counter() - start
+
+def run_split(map, jobs, deadline=None):
+    """
+    Runs the array engine with the search split over `jobs` worker processes,
+    returning (solved, nodes, seconds).
+    """
+    state, island_degrees = hashi_search.make_state(map)
+    start = time.perf_counter()
+    try:
+        solved = hashi_search.solve_state(state, island_degrees, jobs=jobs, deadline=deadline)
+    except hashi_search.SearchTimeout:
+        solved = None
+    return solved, state.nodes, time.perf_counter() - start
+
+def run_sat(map, deadline=None):
+    """
+    Runs the SAT engine on a puzzle, returning (solved, decisions, seconds).
+    """
+    stats = hashi_sat.SATStats()
+    start = time.perf_counter()
+    try:
+        solved = hashi_sat.solve(map, stats, deadline) is not None
+    except hashi_search.SearchTimeout:
+        solved = None
+    return solved, stats.counts['decisions'], time.perf_counter() - start
+
+# Each variant is called with a puzzle and a deadline (or None), and
+# returns (solved, nodes, seconds), with solved None after a timeout
+VARIANTS = {
+    'conflicts': (('plain', lambda map, deadline: run_backtrack(map, False, deadline)),
+                  ('conflicts', lambda map, deadline: run_backtrack(map, True, deadline))),
+    'order':     (('static', lambda map, deadline: run_array(map, 'static', deadline=deadline)),
+                  ('dynamic', lambda map, deadline: run_array(map, 'dynamic', deadline=deadline))),
+    'split':     (('sequential', lambda map, deadline: run_array(map, 'dynamic', deadline=deadline)),
+                  ('parallel', lambda map, deadline: run_split(map, os.cpu_count(), deadline))),
+    'backjump':  (('chronological', lambda map, deadline: run_array(map, 'dynamic', False,
+                                                                     deadline=deadline)),
+                  ('backjump', lambda map, deadline: run_array(map, 'dynamic', True, deadline=deadline))),
+    'table':     (('no table', lambda map, deadline: run_array(map, 'dynamic', deadline=deadline)),
+                  ('table', lambda map, deadline: run_array(map, 'dynamic', table_size=1 << 16,
+                                                            deadline=deadline))),
+    'engine':    (('array', lambda map, deadline: run_array(map, 'dynamic', deadline=deadline)),
+                  ('sat', run_sat)),
+}
+
+def random_map(size, rng, density=0.2):
+    """
+    Returns a random size x size grid of islands (not necessarily solvable).
+    """
+    islands = rng.random((size, size)) < density
+    return (islands * rng.integers(1, 13, (size, size))).astype(np.int32)
+
+def time_call(function, map, repeat):
+    """
+    Returns the best time of `repeat` calls of function(map).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(map)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+# Small grids on which the identify_potential_bridges versions are
+# checked before timing: empty grids, islands on the border and islands
+# with no neighbours
+EDGE_MAPS = (
+    ('empty 0x0', np.zeros((0, 0), dtype=np.int32)),
+    ('empty 4x5', np.zeros((4, 5), dtype=np.int32)),
+    ('single island', np.array([[3]], dtype=np.int32)),
+    ('border islands', np.array([[1, 0, 0, 2],
+                                 [0, 0, 0, 0],
+                                 [0, 0, 0, 0],
+                                 [4, 0, 0, 3]], dtype=np.int32)),
+    ('isolated island', np.array([[0, 0, 0],
+                                  [0, 5, 0],
+                                  [0, 0, 0]], dtype=np.int32)),
+    ('crossing', np.array([[0, 2, 0],
+                           [3, 0, 4],
+                           [0, 1, 0]], dtype=np.int32)),
+    ('mixed', np.array([[1, 0, 2, 0, 0],
+                        [0, 0, 0, 0, 0],
+                        [0, 0, 0, 0, 6]], dtype=np.int32)),
+)
+
+def identify_differences(map):
+    """
+    Returns the names of the results of identify_potential_bridges_np and
+    identify_potential_bridges_fast that differ from those of
+    identify_potential_bridges on map (an empty list if they all agree).
+    """
+    potential_bridges, island_degrees, conflicts = identify_potential_bridges(map)
+    differences = []
+
+    ends, orientation, degrees, crossings = identify_potential_bridges_np(map)
+    if [((r1, c1), (r2, c2), o) for (r1, c1, r2, c2), o in
+            zip(ends.tolist(), orientation.tolist())] != potential_bridges:
+        differences.append('np bridges')
+    if {(r, c): degrees[r, c] for (r, c) in island_degrees} != island_degrees:
+        differences.append('np degrees')
+    pairs = {(k, h) for k, crossed in enumerate(conflicts) for h in crossed}
+    if {(v, h) for v, h in crossings.tolist()} | {(h, v) for v, h in crossings.tolist()} != pairs:
+        differences.append('np crossings')
+
+    fast = identify_potential_bridges_fast(map)
+    for name, loop_result, fast_result in zip(('bridges', 'degrees', 'conflicts'),
+                                              (potential_bridges, island_degrees, conflicts), fast):
+        if fast_result != loop_result:
+            differences.append('fast ' + name)
+    return differences
+
+def bench_identify(puzzles):
+    """
+    Checks identify_potential_bridges_np and identify_potential_bridges_fast
+    against identify_potential_bridges on EDGE_MAPS, the given puzzles and
+    random grids, and times them on the puzzles and random grids.
+    """
+    for name, map in EDGE_MAPS:
+        differences = identify_differences(map)
+        if differences:
+            print('  results differ on', name + ':', ', '.join(differences))
+            exit(1)
+    print('%d edge cases agree' % len(EDGE_MAPS))
+
+    rng = np.random.default_rng(3411)
+    maps = []
+    for name in puzzles:
+        with open(name) as f:
+            nrow, ncol, map = scan_map(f)
+        maps.append((name, map))
+    for size in (10, 25, 50, 100, 200):
+        maps.append(('random %dx%d' % (size, size), random_map(size, rng)))
+
+    print('%-30s %12s %12s %12s %8s' % ('puzzle', 'loop', 'arrays', 'as lists', 'speedup'))
+    for name, map in maps:
+        differences = identify_differences(map)
+        if differences:
+            print('  results differ on', name + ':', ', '.join(differences))
+            exit(1)
+        time0 = time_call(identify_potential_bridges, map, 5)
+        time1 = time_call(identify_potential_bridges_np, map, 5)
+        time2 = time_call(identify_potential_bridges_fast, map, 5)
+        print('%-30s %11.2fms %11.2fms %11.2fms %7.1fx' % (name, 1000*time0, 1000*time1, 1000*time2, time0/time2))
+
+# The benchmark corpus: every size, style and seed
+SIZES = (10, 25, 50, 100)
+STYLES = ('sparse', 'tree', 'dense', 'sprout')
+SEEDS = (1, 2, 3)
+
+# Measurements compared with the baseline, and the smallest change in
+# each that counts as a regression, whatever the tolerance
+METRICS = (('time', 0.05), ('nodes', 100), ('prunes', 100), ('memory', 1024))
+
+def build_corpus(directory, bridgen):
+    """
+    Writes the seeded puzzles of the corpus into the directory, using the
+    bridgen executable; the same seeds always give the same puzzles.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for size in SIZES:
+        for style in STYLES:
+            for seed in SEEDS:
+                name = os.path.join(directory, '%s_%d_%d.in' % (style, size, seed))
+                output = subprocess.run([bridgen, str(size), str(size), str(seed), style],
+                                        check=True, capture_output=True).stdout
+                with open(name, 'wb') as f:
+                    f.write(output)
+                print(name)
+
+def measure_puzzle(task):
+    """
+    Solves one corpus puzzle as hashi_batch does, and adds the peak memory
+    of the process in kilobytes. Each puzzle runs in a freshly spawned
+    worker process, so the peak is that of the interpreter, the solver
+    modules and this puzzle alone (a forked worker would start from the
+    parent's peak).
+    """
+    result = hashi_batch.solve_puzzle(task)
+    result['memory'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    del result['solution']
+    return result
+
+def run_corpus(directory, ordering, timeout):
+    """
+    Solves every puzzle in the corpus directory, printing a line for each.
+    Returns the results as a dictionary keyed by puzzle name.
+    """
+    tasks = [(os.path.basename(name), map, ordering, timeout, False, None, 0)
+             for name, map in hashi_batch.read_puzzles([directory])]
+    results = {}
+    print('%-24s %-10s %9s %12s %12s %10s' % ('puzzle', 'status', 'time', 'nodes', 'prunes', 'memory'))
+    with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        for result in pool.imap(measure_puzzle, tasks):
+            print('%-24s %-10s %8.3fs %12s %12s %8dkB' % (result['name'], result['status'], result['time'],
+                                                          result['nodes'], result['prunes'], result['memory']))
+            results[result.pop('name')] = result
+    return results
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares corpus results with a baseline. Returns a list of messages,
+    one for every puzzle that no longer solves, or whose time, nodes,
+    prunes or memory grew by more than the tolerance (a fraction).
+    """
+    regressions = []
+    for name, old in sorted(baseline.items()):
+        new = results.get(name)
+        if new is None:
+            regressions.append('%s: missing from the corpus' % name)
+            continue
+        if old['status'] == 'solved' and new['status'] != 'solved':
+            regressions.append('%s: %s, was solved' % (name, new['status']))
+            continue
+        if new['status'] != 'solved':
+            continue
+        for metric, floor in METRICS:
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            if new[metric] > old[metric] * (1 + tolerance) and new[metric] - old[metric] > floor:
+                regressions.append('%s: %s %s, was %s' % (name, metric, new[metric], old[metric]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--compare',type=str,default='conflicts',
+                        help='conflicts, order, split, backjump, table, engine or identify')
+    parser.add_argument('puzzles',nargs='*',help='puzzle files')
+    parser.add_argument('--build-corpus',type=str,default=None,
+                        help='directory to write the seeded corpus to')
+    parser.add_argument('--bridgen',type=str,default='./bridgen',
+                        help='bridgen executable used to build the corpus')
+    parser.add_argument('--corpus',type=str,default=None,
+                        help='directory of corpus puzzles to solve')
+    parser.add_argument('--order',type=str,default='dynamic',choices=('static','dynamic'),
+                        help='static or dynamic bridge ordering')
+    parser.add_argument('--timeout',type=float,default=60,
+                        help='time limit per puzzle and variant in seconds (0 for none)')
+    parser.add_argument('--baseline',type=str,default=None,
+                        help='baseline file to compare the corpus results with')
+    parser.add_argument('--save-baseline',type=str,default=None,
+                        help='file to save the corpus results to')
+    parser.add_argument('--tolerance',type=float,default=0.25,
+                        help='relative growth allowed before a regression is flagged')
+    args = parser.parse_args()
+
+    if args.build_corpus is not None:
+        build_corpus(args.build_corpus, args.bridgen)
+        return
+
+    if args.corpus is not None:
+        results = run_corpus(args.corpus, args.order, args.timeout)
+        if args.save_baseline is not None:
+            with open(args.save_baseline, 'w') as f:
+                json.dump(results, f, indent=1, sort_keys=True)
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            regressions = find_regressions(results, baseline, args.tolerance)
+            for message in regressions:
+                print('REGRESSION', message)
+            if regressions:
+                exit(1)
+        return
+
+    if args.compare == 'identify':
+        bench_identify(args.puzzles)
+        return
+
+    if args.compare not in VARIANTS:
+        print('Unknown Comparison:',args.compare)
+        exit(1)
+    (name0, run0), (name1, run1) = VARIANTS[args.compare]
+
+    print('%-30s %12s %9s %12s %9s %8s' % ('puzzle', 'nodes', 'time', 'nodes', 'time', 'speedup'))
+    print('%-30s %22s %22s' % ('', name0, name1))
+    for name in args.puzzles:
+        with open(name) as f:
+            nrow, ncol, map = scan_map(f)
+        results = []
+        for run in (run0, run1):
+            deadline = time.monotonic() + args.timeout if args.timeout > 0 else None
+            results.append(run(map, deadline))
+        (solved0, nodes0, time0), (solved1, nodes1, time1) = results
+        # A run that timed out shows '>' before its counts, which are lower
+        # bounds; so is the speedup if only the first run timed out
+        if solved1 is None:
+            speedup = '-'
+        else:
+            speedup = ('>' if solved0 is None else '') + '%.2fx' % (time0/time1)
+        print('%-30s %12s %8.3fs %12s %8.3fs %8s' % (name, ('>' if solved0 is None else '') + str(nodes0), time0,
+              ('>' if solved1 is None else '') + str(nodes1), time1, speedup))
+        if solved0 is not None and solved1 is not None and solved0 != solved1:
+            print('  results differ: solved', solved0, 'with', name0 + ',', solved1, 'with', name1)
+
+if __name__ == '__main__':
+    main()
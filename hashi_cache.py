@@ -0,0 +1,135 @@
+# hashi_cache.py
+import hashlib
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+# The 8 rotations and reflections of a grid, each as (transpose, flip rows,
+# flip columns) applied in that order
+SYMMETRIES = [(t, fr, fc) for t in (False, True) for fr in (False, True) for fc in (False, True)]
+
+def transform_map(map, symmetry):
+    """
+    Returns the puzzle map rotated or reflected by the given symmetry.
+    """
+    transpose, flip_rows, flip_cols = symmetry
+    if transpose:
+        map = map.T
+    if flip_rows:
+        map = map[::-1, :]
+    if flip_cols:
+        map = map[:, ::-1]
+    return map
+
+def transform_point(point, shape, symmetry):
+    """
+    Maps a cell (r, c) of a grid with the given shape through a symmetry.
+    """
+    transpose, flip_rows, flip_cols = symmetry
+    r, c = point
+    nrow, ncol = shape
+    if transpose:
+        r, c = c, r
+        nrow, ncol = ncol, nrow
+    if flip_rows:
+        r = nrow - 1 - r
+    if flip_cols:
+        c = ncol - 1 - c
+    return r, c
+
+def inverse_point(point, shape, symmetry):
+    """
+    Undoes transform_point; shape is the shape of the original grid.
+    """
+    transpose, flip_rows, flip_cols = symmetry
+    r, c = point
+    nrow, ncol = (shape[1], shape[0]) if transpose else shape
+    if flip_cols:
+        c = ncol - 1 - c
+    if flip_rows:
+        r = nrow - 1 - r
+    if transpose:
+        r, c = c, r
+    return r, c
+
+def canonical_form(map):
+    """
+    Returns (key, symmetry): a key that is the same for all 8 rotations and
+    reflections of the puzzle, and the symmetry that takes this map to the
+    canonical one (the smallest by shape, then contents).
+    """
+    best = None
+    for symmetry in SYMMETRIES:
+        grid = np.ascontiguousarray(transform_map(map, symmetry), dtype=np.int8)
+        form = (grid.shape, grid.tobytes())
+        if best is None or form < best[0]:
+            best = (form, symmetry)
+    (shape, data), symmetry = best
+    key = hashlib.sha256(b'%dx%d:' % shape + data).hexdigest()
+    return key, symmetry
+
+class SolutionCache:
+    """
+    On-disk cache of solved puzzles, shared by rotated and mirrored copies.
+
+    Solutions are stored in the canonical orientation as lists of bridges
+    (r1, c1, r2, c2, planks) in an SQLite file, so several processes can
+    use the same cache. When it holds more than max_entries solutions the
+    least recently used ones are evicted. hits and misses count lookups.
+    """
+
+    def __init__(self, path, max_entries=10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute('CREATE TABLE IF NOT EXISTS solutions '
+                        '(key TEXT PRIMARY KEY, bridges TEXT, last_used REAL)')
+        self.db.commit()
+
+    def get(self, map):
+        """
+        Returns the cached bridges for the puzzle as ((r1, c1), (r2, c2),
+        orientation, planks) tuples in the puzzle's own orientation, or None.
+        """
+        key, symmetry = canonical_form(map)
+        row = self.db.execute('SELECT bridges FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute('UPDATE solutions SET last_used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+
+        bridges = []
+        for r1, c1, r2, c2, planks in json.loads(row[0]):
+            a1 = inverse_point((r1, c1), map.shape, symmetry)
+            a2 = inverse_point((r2, c2), map.shape, symmetry)
+            a1, a2 = min(a1, a2), max(a1, a2)
+            bridges.append((a1, a2, 'H' if a1[0] == a2[0] else 'V', planks))
+        return bridges
+
+    def put(self, map, bridges):
+        """
+        Stores the solution of a puzzle, given as ((r1, c1), (r2, c2),
+        orientation, planks) tuples, and evicts old entries if needed.
+        """
+        key, symmetry = canonical_form(map)
+        stored = []
+        for a1, a2, orientation, planks in bridges:
+            if planks > 0:
+                stored.append(transform_point(a1, map.shape, symmetry)
+                              + transform_point(a2, map.shape, symmetry) + (int(planks),))
+        self.db.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)',
+                        (key, json.dumps(stored), time.time()))
+        count = self.db.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute('DELETE FROM solutions WHERE key NOT IN '
+                            '(SELECT key FROM solutions ORDER BY last_used DESC LIMIT ?)',
+                            (self.max_entries,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
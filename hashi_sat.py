@@ -0,0 +1,145 @@
+# hashi_sat.py
+from cdcl import Solver
+from hashi_search import SearchTimeout, make_state
+
+class HashiCNF:
+    """
+    CNF encoding of a Hashiwokakero puzzle.
+
+    Each candidate bridge b gets one variable per possible plank, x(b, k)
+    meaning "bridge b has at least k planks" (k = 1..hi), with x(b, k+1)
+    implying x(b, k); the number of planks is the number of these that are
+    true. Two crossing bridges cannot both have a first plank. For each
+    island, a sequential counter over the plank variables of its bridges
+    makes their count equal to the number on the island. The domains come
+    from a HashiState after its initial propagation, so planks that are
+    already forced become unit clauses.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.num_vars = 0
+        self.clauses = []
+        self.planks = []  # planks[b] = [x(b, 1), x(b, 2), ...]
+
+        for b in range(len(state.lo)):
+            self.planks.append([self.new_var() for _ in range(state.hi[b])])
+            for k, x in enumerate(self.planks[b]):
+                if k < state.lo[b]:
+                    self.clauses.append([x])
+                if k > 0:
+                    self.clauses.append([-x, self.planks[b][k - 1]])
+
+        for b, crossing in enumerate(state.conflicts):
+            for c in crossing:
+                if b < c and self.planks[b] and self.planks[c]:
+                    self.clauses.append([-self.planks[b][0], -self.planks[c][0]])
+
+        for i, bridges in enumerate(state.adjacent):
+            self.exactly([x for b in bridges for x in self.planks[b]], state.value[i])
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def exactly(self, lits, count):
+        """
+        Adds clauses making exactly `count` of the literals true, using a
+        sequential counter: s[j] after literal i means "at least j of the
+        first i literals are true", defined in both directions. None stands
+        for the constant false; j = 0 is always true.
+        """
+        if count > len(lits):
+            self.clauses.append([])  # not enough planks: unsatisfiable
+            return
+        s = [None] * (count + 2)
+        for x in lits:
+            t = [None] * (count + 2)
+            for j in range(1, count + 2):
+                prev = s[j]
+                below = s[j - 1] if j > 1 else True
+                if below is None:
+                    t[j] = prev  # x cannot make the difference
+                    continue
+                t[j] = self.new_var()
+                # t[j] <-> prev or (below and x)
+                if prev is not None:
+                    self.clauses.append([-prev, t[j]])
+                if below is True:
+                    self.clauses.append([-x, t[j]])
+                    self.clauses.append([-t[j], x] + ([prev] if prev is not None else []))
+                else:
+                    self.clauses.append([-below, -x, t[j]])
+                    self.clauses.append([-t[j], below] + ([prev] if prev is not None else []))
+                    self.clauses.append([-t[j], x] + ([prev] if prev is not None else []))
+            s = t
+
+        if count > 0:
+            self.clauses.append([s[count]] if s[count] is not None else [])
+        if s[count + 1] is not None:
+            self.clauses.append([-s[count + 1]])
+
+    def bridges(self, model):
+        """
+        Decodes a model into ((r1, c1), (r2, c2), orientation, planks) tuples.
+        """
+        return [(a1, a2, orientation, sum(model[x] for x in self.planks[b]))
+                for b, (a1, a2, orientation) in enumerate(self.state.potential_bridges)]
+
+class SATStats:
+    """
+    Counters of a CDCL run, collected when a SATStats is passed to solve,
+    as hashi_search.SearchStats is for the array engine: the variables of
+    the encoding, and the solver's decisions, conflicts, propagations,
+    restarts and learnt clauses kept.
+    """
+
+    def __init__(self):
+        self.counts = Solver(0).as_dict()
+
+    def record(self, solver):
+        """
+        Takes the counters of a solver that has run.
+        """
+        self.counts = solver.as_dict()
+
+    def as_dict(self):
+        """
+        Returns the counters as a dictionary ready to be written as JSON.
+        """
+        return dict(self.counts)
+
+    def report(self):
+        """
+        Returns the counters as lines of text.
+        """
+        return ['%-13s %d' % (name + ':', count) for name, count in self.counts.items()]
+
+def solve(map, stats=None, deadline=None):
+    """
+    Solves the puzzle by encoding it as CNF and running the CDCL solver.
+    Returns the bridges as ((r1, c1), (r2, c2), orientation, planks) tuples,
+    or None if there is no solution. If a SATStats is given, the solver's
+    counters are recorded in it, also when SearchTimeout is raised because
+    the deadline (a time.monotonic() value) passed first.
+    """
+    state, _ = make_state(map)
+    bridges = None
+    solver = Solver(0)
+    try:
+        if state.is_feasible():
+            cnf = HashiCNF(state)
+            solver = Solver(cnf.num_vars)
+            for clause in cnf.clauses:
+                if not solver.add_clause(clause):
+                    break
+            else:
+                solved = solver.solve(deadline)
+                if solved is None:
+                    raise SearchTimeout()
+                if solved:
+                    bridges = cnf.bridges(solver.model())
+    finally:
+        if stats is not None:
+            stats.record(solver)
+    return bridges
@@ -0,0 +1,690 @@
+# hashi_search.py
+import collections
+import multiprocessing
+import time
+
+from identify_potential_bridges import identify_potential_bridges_fast
+from hashi_state import HashiState
+
+# The search checks its deadline once every this many nodes
+CHECK_INTERVAL = 256
+
+class SearchTimeout(Exception):
+    """
+    Raised when a search runs past its deadline; any SearchStats passed to
+    it hold the counts up to that point.
+    """
+    pass
+
+class SearchStats:
+    """
+    Counters describing a search, collected when a SearchStats is passed to
+    search (and left out entirely otherwise): the plank values tried, the
+    assignments refuted by each kind of contradiction (see
+    HashiState.FAILURES), the deepest choice point, and how many choice
+    points ran out of values at each depth, i.e. where the search backtracked,
+    and how many choice points were skipped by backjumps. Assignments
+    refused by a recorded nogood are counted as 'nogood' prunes, and those
+    refused by the transposition table as 'transposition' prunes, along
+    with the table's probes and hits. When counting solutions, the lookups
+    of region counts in the memo are counted separately (memo probes and
+    hits).
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.assignments = [0] * (HashiState.MAX_PLANKS + 1)
+        self.prunes = {reason: 0 for reason in HashiState.FAILURES + ('nogood', 'transposition')}
+        self.max_depth = 0
+        self.backtracks = {}  # depth -> number of exhausted choice points
+        self.backjumps = 0    # choice points skipped by backjumps
+        self.table_probes = 0
+        self.table_hits = 0
+        self.memo_probes = 0
+        self.memo_hits = 0
+
+    def merge(self, other):
+        """
+        Adds the counters of another SearchStats, e.g. from a worker process.
+        """
+        self.nodes += other.nodes
+        for planks, count in enumerate(other.assignments):
+            self.assignments[planks] += count
+        for reason, count in other.prunes.items():
+            self.prunes[reason] += count
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for depth, count in other.backtracks.items():
+            self.backtracks[depth] = self.backtracks.get(depth, 0) + count
+        self.backjumps += other.backjumps
+        self.table_probes += other.table_probes
+        self.table_hits += other.table_hits
+        self.memo_probes += other.memo_probes
+        self.memo_hits += other.memo_hits
+
+    def as_dict(self):
+        """
+        Returns the counters as a dictionary ready to be written as JSON.
+        """
+        return {'nodes': self.nodes,
+                'assignments': {str(planks): count for planks, count in enumerate(self.assignments)},
+                'prunes': dict(self.prunes),
+                'max_depth': self.max_depth,
+                'backjumps': self.backjumps,
+                'table_probes': self.table_probes,
+                'table_hits': self.table_hits,
+                'memo_probes': self.memo_probes,
+                'memo_hits': self.memo_hits,
+                'backtracks': {str(depth): count for depth, count in sorted(self.backtracks.items())}}
+
+    def report(self):
+        """
+        Returns the counters as lines of text.
+        """
+        lines = ['nodes:       %d' % self.nodes,
+                 'assignments: ' + '  '.join('%d planks %d' % (planks, count)
+                                             for planks, count in enumerate(self.assignments)),
+                 'prunes:      ' + '  '.join('%s %d' % (reason, count)
+                                             for reason, count in self.prunes.items()),
+                 'max depth:   %d' % self.max_depth,
+                 'backjumps:   %d' % self.backjumps,
+                 'table hits:  %d of %d probes (%.1f%%)' % (self.table_hits, self.table_probes,
+                                                           100.0 * self.table_hits / max(self.table_probes, 1)),
+                 'memo hits:   %d of %d probes (%.1f%%)' % (self.memo_hits, self.memo_probes,
+                                                           100.0 * self.memo_hits / max(self.memo_probes, 1)),
+                 'backtracks by depth:']
+        for depth, count in sorted(self.backtracks.items()):
+            lines.append('  %6d %10d' % (depth, count))
+        return lines
+
+def static_order(state, island_degrees):
+    """
+    Orders the bridges by the connectivity potential of their endpoints,
+    so that bridges between islands with fewer options are tried first.
+    """
+    potential_bridges = state.potential_bridges
+    return sorted(range(len(potential_bridges)),
+                  key=lambda b: island_degrees[potential_bridges[b][0]]
+                              + island_degrees[potential_bridges[b][1]])
+
+def select_bridge(state, since=0, scope=None):
+    """
+    Dynamic variable ordering: returns the unfixed bridge with the fewest
+    plank options, breaking ties by the tightest endpoint (the smallest
+    spare capacity beyond its number), or None if every bridge is fixed.
+
+    Only the bridges at islands changed since the given trail position
+    (the previous decision and its propagation) are considered, so the
+    search keeps working in the region where the last conflict would be
+    found; all bridges in scope (default: every bridge) are scanned when
+    that region is settled.
+    """
+    lo = state.lo
+    hi = state.hi
+    candidates = set()
+    for entry in state.trail[since:]:
+        b = entry[0]
+        for i in (state.end1[b], state.end2[b]):
+            for k in state.adjacent[i]:
+                if lo[k] < hi[k]:
+                    candidates.add(k)
+    if not candidates:
+        candidates = range(len(lo)) if scope is None else scope
+
+    best = None
+    best_key = None
+    for b in candidates:
+        options = hi[b] - lo[b]
+        if options == 0:
+            continue
+        i = state.end1[b]
+        j = state.end2[b]
+        slack = min(state.sum_hi[i] - state.value[i], state.sum_hi[j] - state.value[j])
+        key = (options, slack, b)
+        if best_key is None or key < best_key:
+            best = b
+            best_key = key
+    return best
+
+def plank_order(state, b):
+    """
+    Orders the plank values of bridge b, largest first: a bridge chosen
+    for its tight endpoints is more likely to be needed than not.
+    """
+    return range(state.hi[b], state.lo[b] - 1, -1)
+
+def next_choice(state, order, index, since, scope=None):
+    """
+    Returns (bridge, plank values, index) for the next branching point, or
+    (None, None, index) when every bridge is fixed. With a static order the
+    bridges are taken in that order from position index, skipping those
+    fixed by propagation; with order None they are chosen dynamically,
+    starting from the islands changed since trail position `since`.
+    """
+    if order is None:
+        b = select_bridge(state, since, scope)
+        if b is None:
+            return None, None, index
+        return b, plank_order(state, b), index
+
+    while index < len(order) and state.is_fixed(order[index]):
+        index += 1
+    if index == len(order):
+        return None, None, index
+    b = order[index]
+    return b, range(state.lo[b], state.hi[b] + 1), index
+
+class NogoodStore:
+    """
+    Bounded store of nogoods: combinations of decisions, as (bridge, planks)
+    pairs, found to have no solution together. Each nogood is indexed under
+    each of its pairs, so checking a new decision only looks at the nogoods
+    that mention it. Only nogoods of up to `max_size` decisions are kept,
+    since longer ones rarely apply again and make every check slower; when
+    there are more than `capacity` nogoods, the oldest are forgotten.
+    """
+
+    def __init__(self, capacity=10000, max_size=8):
+        self.capacity = capacity
+        self.max_size = max_size
+        self.nogoods = collections.deque()
+        self.index = {}  # (bridge, planks) -> nogoods containing it
+
+    def add(self, nogood):
+        nogood = tuple(nogood)
+        if len(nogood) > self.max_size:
+            return
+        self.nogoods.append(nogood)
+        for pair in nogood:
+            self.index.setdefault(pair, []).append(nogood)
+        if len(self.nogoods) > self.capacity:
+            old = self.nogoods.popleft()
+            for pair in old:
+                entries = self.index[pair]
+                entries.remove(old)
+                if not entries:
+                    del self.index[pair]
+
+    def check(self, state, b, planks):
+        """
+        Returns the other bridges of a nogood that placing the given planks
+        on bridge b would complete, or None if there is no such nogood.
+        """
+        lo = state.lo
+        hi = state.hi
+        for nogood in self.index.get((b, planks), ()):
+            if all(lo[k] == p and hi[k] == p for k, p in nogood if k != b):
+                return [k for k, p in nogood if k != b]
+        return None
+
+class TranspositionTable:
+    """
+    Fixed-size table of the hashes of residual states (HashiState.hash)
+    known to have no solution, each with the decisions, as (bridge, planks)
+    pairs, that its refutation blamed. Each hash maps to a slot of two
+    entries: one kept for the state whose refutation took the most search
+    nodes, and one that is always replaced, so that a run of cheap
+    refutations cannot push out an expensive one. The size must be a power
+    of two.
+    """
+
+    def __init__(self, size=1 << 16):
+        if size <= 0 or size & (size - 1):
+            raise ValueError('transposition table size must be a power of two, not %d' % size)
+        self.mask = size - 1
+        self.keys = [None] * (2 * size)
+        self.efforts = [0] * (2 * size)
+        self.refuted = [None] * (2 * size)
+
+    def add(self, key, effort, refuted):
+        slot = 2 * (key & self.mask)
+        if effort >= self.efforts[slot]:
+            self.keys[slot + 1] = self.keys[slot]
+            self.refuted[slot + 1] = self.refuted[slot]
+            self.keys[slot] = key
+            self.efforts[slot] = effort
+            self.refuted[slot] = refuted
+        else:
+            self.keys[slot + 1] = key
+            self.refuted[slot + 1] = refuted
+
+    def get(self, key):
+        """
+        Returns the decisions refuted with the state of this hash, or None
+        if it is not in the table.
+        """
+        slot = 2 * (key & self.mask)
+        if self.keys[slot] == key:
+            return self.refuted[slot]
+        if self.keys[slot + 1] == key:
+            return self.refuted[slot + 1]
+        return None
+
+def table_culprits(state, refuted):
+    """
+    Returns the decision levels to blame for reaching a state found in the
+    TranspositionTable, given the decisions refuted with it. If they all
+    still hold, they are enough; otherwise the state was reached by other
+    decisions, and as the table does not say which of them matter, all
+    decisions made so far are blamed.
+    """
+    lo = state.lo
+    hi = state.hi
+    if all(lo[k] == p and hi[k] == p for k, p in refuted):
+        return state.explain([k for k, p in refuted])
+    return (1 << state.level) - 1
+
+def search(state, order=None, scope=None, stats=None, since=None, backjump=True,
+           table_size=0, deadline=None):
+    """
+    Backtracking search driven by an explicit stack of choice points, so
+    its depth is not limited by Python's recursion limit. Each choice point
+    holds a bridge, its remaining plank values, and the trail position to
+    undo to before the next value is tried. The constraints are propagated
+    after every assignment. With a scope (a component from
+    state.components()) only the bridges of that component are branched on.
+    If a SearchStats is given, its counters are updated as the search goes.
+    `since` is the trail position of the last decision already made, if
+    any, for the dynamic order to continue from.
+
+    With backjump, each choice point also collects its culprits: the
+    decision levels that caused its bridge's domain and the failures of its
+    values (see HashiState.explain). When its values run out, the search
+    jumps straight back to the latest culprit, passing on the others, and
+    records the culprits' decisions as a nogood, which is checked before
+    later decisions. Otherwise it backtracks chronologically. Decisions
+    made before the search starts are taken as given.
+
+    With a `table_size` (a power of two; 0, the default, for none), the
+    residual state at every exhausted choice point is added to a
+    TranspositionTable of that many slots, with its culprits' decisions,
+    and a decision that leads to a state in the table is refused without
+    searching it again. The culprits of the refusal are those decisions if
+    they still hold; but a state is mostly reached again by other
+    decisions, and then all earlier ones are blamed (see table_culprits),
+    which weakens backjumping; so the table is off unless asked for.
+
+    With a deadline (a time.monotonic() value), the clock is read every
+    CHECK_INTERVAL nodes, and SearchTimeout is raised once it has passed.
+    Returns True with the solution left in state, or False.
+    """
+    if since is None:
+        since = state.mark()
+    root = state.level
+    given = (1 << (root + 1)) - 1  # levels of the decisions taken as given
+    nogoods = NogoodStore() if backjump else None
+    table = TranspositionTable(table_size) if table_size else None
+    stack = []
+    index = 0
+    while True:
+        # Descend: open a choice point for the next unfixed bridge
+        state.nodes += 1
+        if stats is not None:
+            stats.nodes += 1
+        if deadline is not None and state.nodes % CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            state.level = root
+            raise SearchTimeout()
+        b, values, index = next_choice(state, order, index, since, scope)
+        if b is None:
+            return True  # every bridge is fixed and every island is satisfied
+        culprits = state.explain([b]) & ~given if backjump else 0
+        stack.append([b, iter(values), state.mark(), index, culprits, None, state.hash, state.nodes])
+        if stats is not None:
+            if len(stack) > stats.max_depth:
+                stats.max_depth = len(stack)
+
+        # Try the next plank value of the deepest open choice point,
+        # backtracking past choice points whose values are exhausted
+        while True:
+            point = stack[-1]
+            b, values, mark, index, culprits = point[:5]
+            depth = len(stack)
+            state.undo(mark)
+            planks = next(values, None)
+            if planks is None:
+                if stats is not None:
+                    stats.backtracks[depth] = stats.backtracks.get(depth, 0) + 1
+                if not backjump:
+                    if table is not None:
+                        table.add(point[6], state.nodes - point[7], ())
+                    stack.pop()
+                    if not stack:
+                        state.level = root
+                        return False
+                    continue
+                if not culprits:
+                    state.level = root
+                    return False  # no decision of this search is to blame
+                target = culprits.bit_length() - 1
+                refuted = tuple((stack[level - root - 1][0], stack[level - root - 1][5])
+                                for level in range(root + 1, target + 1) if culprits >> level & 1)
+                nogoods.add(refuted)
+                if stats is not None:
+                    stats.backjumps += depth - 1 - (target - root)
+                if table is not None:
+                    # This state and those skipped over hold every culprit, so fail too
+                    for skipped in stack[target - root:]:
+                        table.add(skipped[6], state.nodes - skipped[7], refuted)
+                del stack[target - root:]
+                stack[-1][4] |= culprits & ~(1 << target)
+                continue
+
+            point[5] = planks
+            state.level = root + depth
+            if stats is not None:
+                stats.assignments[planks] += 1
+            if backjump:
+                clash = nogoods.check(state, b, planks)
+                if clash is not None:
+                    point[4] |= state.explain(clash) & ~given
+                    state.prunes += 1
+                    if stats is not None:
+                        stats.prunes['nogood'] += 1
+                    continue
+            if state.assign(b, planks):
+                if table is not None:
+                    refuted = table.get(state.hash)
+                    hit = refuted is not None
+                    if stats is not None:
+                        stats.table_probes += 1
+                        stats.table_hits += hit
+                    if hit:
+                        if backjump:
+                            point[4] |= table_culprits(state, refuted) & ~given & ~(1 << state.level)
+                        state.prunes += 1
+                        if stats is not None:
+                            stats.prunes['transposition'] += 1
+                        continue
+                index += 1
+                since = mark
+                break
+            if backjump:
+                point[4] |= state.explain(state.failed) & ~given & ~(1 << state.level)
+            state.prunes += 1
+            if stats is not None:
+                stats.prunes[state.failure] += 1
+
+def component_order(order, scope):
+    """
+    Restricts a static order to the bridges of one component.
+    """
+    if order is None:
+        return None
+    members = set(scope)
+    return [b for b in order if b in members]
+
+def make_state(map):
+    """
+    Returns a fresh HashiState for the puzzle, and the island degrees used
+    by the static order.
+    """
+    potential_bridges, island_degrees, conflicts = identify_potential_bridges_fast(map)
+    return HashiState(map, potential_bridges, conflicts), island_degrees
+
+def split_problems(state, order, scope, depth):
+    """
+    Enumerates the consistent assignments of the first `depth` branching
+    bridges of a component, choosing them as search would. Returns a list
+    of sub-problems, each a list of (bridge, planks) decisions, in the order
+    search would visit them; or None if a solution turned up within that
+    depth, in which case it is left in state.
+    """
+    problems = []
+    decisions = []
+
+    def expand(index, since, level):
+        state.nodes += 1
+        b, values, index = next_choice(state, order, index, since, scope)
+        if b is None:
+            return True
+        if level == depth:
+            problems.append(list(decisions))
+            return False
+        mark = state.mark()
+        for planks in values:
+            if state.assign(b, planks):
+                decisions.append((b, planks))
+                if expand(index + 1, mark, level + 1):
+                    return True
+                decisions.pop()
+            else:
+                state.prunes += 1
+            state.undo(mark)
+        return False
+
+    if expand(0, state.mark(), 0):
+        return None
+    return problems
+
+def split_search(state, order, scope, ordering, jobs, depth=None, stats=None, deadline=None,
+                 table_size=0):
+    """
+    Solves one component by splitting the top of its search tree over a pool
+    of `jobs` worker processes. The consistent assignments of the first
+    `depth` branching bridges (by default, the smallest depth giving at
+    least 4 sub-problems per worker) are handed out one at a time, so that
+    a worker that finishes early takes the next one, and the pool is
+    stopped as soon as one of them is solved, or one runs out of time.
+    Returns True with the solution left in state, or False.
+    """
+    if depth is None:
+        depth = 1
+        problems = split_problems(state, order, scope, depth)
+        while problems and len(problems) < 4 * jobs and depth < len(scope):
+            depth += 1
+            problems = split_problems(state, order, scope, depth)
+    else:
+        problems = split_problems(state, order, scope, depth)
+    if problems is None:
+        return True
+    if not problems:
+        return False
+
+    with multiprocessing.Pool(min(jobs, len(problems))) as pool:
+        tasks = [(state.map, scope, ordering, None if stats is None else SearchStats(), decisions, deadline,
+                  table_size)
+                 for decisions in problems]
+        for planks, nodes, prunes, worker_stats, timed_out in pool.imap_unordered(_solve_component_task, tasks):
+            state.nodes += nodes
+            state.prunes += prunes
+            if stats is not None:
+                stats.merge(worker_stats)
+            if timed_out:
+                raise SearchTimeout()
+            if planks is not None:
+                for b, p in planks:
+                    state.assign(b, p)
+                return True  # leaving the block stops the other workers
+    return False
+
+def solve_component(map, scope, ordering='dynamic', stats=None, decisions=(), deadline=None,
+                    table_size=0):
+    """
+    Solves one independent component of the puzzle in a fresh state, e.g.
+    in a worker process, after making the given (bridge, planks) decisions.
+    Returns ([(bridge, planks), ...], nodes, prunes, stats, timed out), with
+    None in place of the list if the component has no solution or the
+    deadline passed.
+    """
+    state, island_degrees = make_state(map)
+    if not state.is_feasible():
+        return None, state.nodes, state.prunes, stats, False
+    order = static_order(state, island_degrees) if ordering == 'static' else None
+    since = None
+    for b, planks in decisions:
+        since = state.mark()
+        if not state.assign(b, planks):
+            return None, state.nodes, state.prunes, stats, False
+    try:
+        solved = search(state, component_order(order, scope), scope, stats, since,
+                        table_size=table_size, deadline=deadline)
+    except SearchTimeout:
+        return None, state.nodes, state.prunes, stats, True
+    if not solved:
+        return None, state.nodes, state.prunes, stats, False
+    return [(b, state.lo[b]) for b in scope], state.nodes, state.prunes, stats, False
+
+def solve_state(state, island_degrees, ordering='dynamic', jobs=1, stats=None, split=None,
+                deadline=None, table_size=0):
+    """
+    Solves the puzzle held in a fresh state, choosing bridges in a 'static'
+    or 'dynamic' order. After the initial propagation the puzzle is split
+    into independent components, which are solved one after another, or by
+    a pool of `jobs` worker processes, and merged into the state. A puzzle
+    that is a single component is instead split at the top of its search
+    tree, `split` branching bridges deep (see split_search). Search
+    counters are collected in stats, if given. Each search keeps a
+    transposition table of `table_size` slots (see search). SearchTimeout
+    is raised if the deadline (a time.monotonic() value) passes.
+    Returns True with the solution left in state, or False.
+    """
+    if not state.is_feasible():
+        return False
+    components = state.components()
+
+    if jobs > 1 and len(components) > 1:
+        with multiprocessing.Pool(min(jobs, len(components))) as pool:
+            tasks = [(state.map, scope, ordering, None if stats is None else SearchStats(), (), deadline,
+                      table_size)
+                     for scope in components]
+            for planks, nodes, prunes, worker_stats, timed_out in pool.imap_unordered(_solve_component_task, tasks):
+                state.nodes += nodes
+                state.prunes += prunes
+                if stats is not None:
+                    stats.merge(worker_stats)
+                if timed_out:
+                    raise SearchTimeout()
+                if planks is None:
+                    return False  # leaving the block stops the other workers
+                for b, p in planks:
+                    state.assign(b, p)
+        return True
+
+    order = static_order(state, island_degrees) if ordering == 'static' else None
+    if jobs > 1 and len(components) == 1:
+        scope = components[0]
+        return split_search(state, component_order(order, scope), scope, ordering, jobs, split, stats,
+                            deadline, table_size)
+    for scope in components:
+        if not search(state, component_order(order, scope), scope, stats, table_size=table_size,
+                      deadline=deadline):
+            return False
+    return True
+
+def solve(map, ordering='dynamic', jobs=1, stats=None, split=None, deadline=None, table_size=0):
+    """
+    Solves the puzzle with the array-backed engine (see solve_state).
+    Returns the solved HashiState, or None if there is no solution; raises
+    SearchTimeout if the deadline passes first.
+    """
+    state, island_degrees = make_state(map)
+    if solve_state(state, island_degrees, ordering, jobs, stats, split, deadline, table_size):
+        return state
+    return None
+
+def count_region(state, scope, cap, memo, stats=None, deadline=None):
+    """
+    Counts the solutions of one component (see HashiState.components),
+    stopping at `cap`. A bridge is chosen as select_bridge would, and for
+    each of its plank values the rest of the component is split again into
+    independent components, whose counts multiply. Counts are memoised by
+    HashiState.region_hash, so a sub-region reached again by a different
+    route is not counted twice. Like search, it keeps an explicit stack of
+    regions being counted rather than recursing once per decision, and its
+    height is recorded as the depth in stats. The state is left as it was
+    found.
+    Returns the number of solutions, or cap if there are at least that many.
+    """
+    stack = []
+
+    def open_region(scope):
+        # Returns the memoised count, or None after pushing a new region
+        key = state.region_hash(scope)
+        if stats is not None:
+            stats.memo_probes += 1
+        if key in memo:
+            if stats is not None:
+                stats.memo_hits += 1
+            return memo[key]
+        state.nodes += 1
+        if stats is not None:
+            stats.nodes += 1
+        if deadline is not None and state.nodes % CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            raise SearchTimeout()
+        b = select_bridge(state, state.mark(), scope)
+        # key, scope, bridge, undo mark, plank values, count so far,
+        # parts of the current assignment, next part, their product
+        stack.append([key, scope, b, state.mark(), iter(plank_order(state, b)), 0, None, 0, 1])
+        if stats is not None and len(stack) > stats.max_depth:
+            stats.max_depth = len(stack)
+        return None
+
+    result = open_region(scope)
+    while stack:
+        region = stack[-1]
+        key, scope, b, mark, values, count, parts, index, product = region
+        if result is not None:  # the count of parts[index] came back
+            product = min(product * result, cap)
+            index += 1
+            region[7] = index
+            region[8] = product
+            result = None
+        if parts is not None:
+            if product != 0 and index < len(parts):
+                result = open_region(parts[index])
+                continue
+            count = min(count + product, cap)
+            region[5] = count
+            state.undo(mark)
+
+        # Assign the next plank value that propagates
+        while True:
+            planks = None if count == cap else next(values, None)
+            if planks is None:
+                break
+            if stats is not None:
+                stats.assignments[planks] += 1
+            if state.assign(b, planks):
+                break
+            state.prunes += 1
+            if stats is not None:
+                stats.prunes[state.failure] += 1
+            state.undo(mark)
+        if planks is None:
+            memo[key] = count
+            stack.pop()
+            result = count
+            continue
+        region[6] = list(state.components(scope))
+        region[7] = 0
+        region[8] = 1
+    return result
+
+def count_state(state, cap=2, stats=None, deadline=None):
+    """
+    Counts the solutions of the puzzle held in a fresh state, stopping at
+    `cap`: with the default of 2, the result tells whether the solution is
+    unique. The puzzle is split into independent components as in
+    solve_state, and each is counted by count_region, sharing one memo; the
+    counts multiply. SearchTimeout is raised if the deadline (a
+    time.monotonic() value) passes. Returns the number of solutions, or cap
+    if there are at least that many.
+    """
+    if not state.is_feasible():
+        return 0
+    memo = {}
+    total = 1
+    for scope in state.components():
+        total = min(total * count_region(state, scope, cap, memo, stats, deadline), cap)
+        if total == 0:
+            break
+    return total
+
+def count_solutions(map, cap=2, stats=None, deadline=None):
+    """
+    Counts the solutions of the puzzle, up to cap (see count_state).
+    """
+    state, _ = make_state(map)
+    return count_state(state, cap, stats, deadline)
+
+def _solve_component_task(task):
+    return solve_component(*task)
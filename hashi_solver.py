@@ -6,29 +6,47 @@ Briefly describe how your program works, including any algorithms and data struc
 
 Our program solves the Hashiwokakero (or Hashi) puzzle using a systematic approach, breaking down the process into distinct phases. 
 Initially, we represent the puzzle as a rectangular array using NumPy, facilitating efficient numerical operations and state representation. 
-This representation is crucial for identifying islands (numbers) and water (dots).In the first phase, we employ 
-the identify_potential_bridges function to scan the puzzle grid and list all feasible bridges between islands. This is achieved by iterating 
-through the grid, and when an island is encountered, we look rightward and downward to find another island to connect with a bridge, avoiding 
-redundant checks and crossings. This function also keeps track of the maximum number of bridges each island can connect to, storing this information 
-in a dictionary that maps island coordinates to their corresponding bridge limits.
-
-In the main hashi_solver.py, we then use a backtracking algorithm to find a valid solution. This method systematically explores potential bridge 
-placements, incrementally building a solution and backtracking when a configuration leads to a dead end or violates the puzzle rules. Bridges are 
-represented as tuples containing their endpoints, orientation, and the number of planks (0 to 3). We prioritize exploring bridge connections between 
-islands with fewer connectivity options, as this heuristic can lead to quicker identification of dead ends and reduce the search space.The validity of 
-a solution is continuously checked through functions like is_solution_valid, ensuring that the number of bridges connected to each island matches the 
-required number and that bridges do not cross each other or islands. The forward_check_and_arc_consistency function further optimizes the search by 
-pruning paths that cannot possibly fulfill all island bridge requirements. Through these strategies, our program can efficiently navigate the complex 
-search space of Hashiwokakero puzzles, aiming to find a valid solution that satisfies all game rules.
+This representation is crucial for identifying islands (numbers) and water (dots). In the first phase, we employ 
+the identify_potential_bridges function to scan the puzzle grid and list all feasible bridges between islands. Looking rightward and downward 
+from each island, it finds the next island to connect with a bridge, records which bridges cross each other, and keeps track of the maximum 
+number of bridges each island can connect to.
 
+By default (--engine array) the puzzle is then solved by hashi_search.py on a compact HashiState (hashi_state.py). Islands and bridges are 
+numbered, each bridge keeps a domain [lo, hi] of plank counts, and every change is pushed onto an undo trail, so backtracking only undoes what 
+changed. After every assignment the constraints are propagated: an island cannot get more planks than its number, nor fewer than its number, 
+and a bridge with planks forces the bridges crossing it to zero. The puzzle is split into independent components, each searched on its own. 
+The search keeps an explicit stack of choice points rather than recursing. With the default dynamic order (--order dynamic) it branches on the 
+bridge with the fewest plank options near the last change; --order static uses a fixed order that favours islands with fewer connectivity 
+options. When a branch fails, the search backjumps to the decision that caused it and records a nogood so the same combination is not tried 
+again; --table N also remembers up to 2N failed states, with the bridges their failure depended on. With --jobs, components (or the 
+top of the search tree of a single component) are solved by a pool of worker processes.
+
+--engine sat instead encodes the puzzle as CNF (hashi_sat.py) and solves it with our own CDCL SAT solver (cdcl.py), and --engine backtrack runs 
+the original tuple-based backtracking search, kept for comparison. With --cache, solutions are stored in an SQLite file and reused for the 
+same puzzle, even rotated or reflected (hashi_cache.py). --count N counts the solutions up to N instead (2 checks that the solution is unique), 
+multiplying the counts of independent regions. --time-limit gives up on a puzzle after that many seconds, --stats prints the search counters, 
+--multi solves every puzzle in the input, and --serve answers JSON requests from one long-lived process, on stdin or a Unix socket (--socket).
 '''
 
 
 
 # hashi_solver.py
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
 import numpy as np
-from scan_print_map import scan_map
+from scan_print_map import scan_map, scan_maps
 from identify_potential_bridges import identify_potential_bridges
+import hashi_search
+import hashi_sat
+from hashi_cache import SolutionCache
+import line_server
+
+# Number of nodes visited by search_for_solution (reset by the caller)
+search_nodes = 0
 
 def is_solution_valid(map, bridges):
     """
@@ -66,6 +84,13 @@ def print_solution(puzzle_map, bridges):
     """
     Prints the solved puzzle map with all bridges placed.
     """
+    for row in format_solution(puzzle_map, bridges):
+        print(row)
+
+def format_solution(puzzle_map, bridges):
+    """
+    Returns the solved puzzle map with all bridges placed, as a list of rows.
+    """
     # Initialize the solution map
     solution_map = np.full(puzzle_map.shape, '.', dtype=str)
 
@@ -95,9 +120,7 @@ def print_solution(puzzle_map, bridges):
                 for r in range(min(r1, r2) + 1, max(r1, r2)):
                     solution_map[r, c1] = symbol
 
-    # Print the solution map
-    for row in solution_map:
-        print(''.join(row))
+    return [''.join(row) for row in solution_map]
 
 def is_dead_end(map, island_bridge_counts):
     """
@@ -155,10 +178,25 @@ def forward_check_and_arc_consistency(map, bridges, island_bridge_counts):
     
     return True
 
-def search_for_solution(map, bridges, island_bridge_counts, index=0):
+def search_for_solution(map, bridges, island_bridge_counts, index=0, conflicts=None, deadline=None):
     """
     Recursive function to search for a valid solution to the Hashiwokakero puzzle.
+    With a deadline (a time.monotonic() value), SearchTimeout is raised at
+    the first node visited after it has passed. Unlike the array engine,
+    which reads the clock every hashi_search.CHECK_INTERVAL nodes, this
+    checks at every node on purpose: each node rescans every island and
+    bridge (a tenth of a second or more on a 50x50 puzzle), so reading the
+    clock less often could overrun the deadline by minutes.
+
+    If a conflict index is given (conflicts[k] lists the bridges crossing
+    bridge k), a plank placement that crosses an existing bridge is pruned
+    immediately instead of being rejected at the leaf.
     """
+    global search_nodes
+    search_nodes += 1
+    if deadline is not None and time.monotonic() > deadline:
+        raise hashi_search.SearchTimeout()
+
     if index == len(bridges):
         if is_solution_valid(map, bridges):
             print_solution(map, bridges)
@@ -168,11 +206,16 @@ def search_for_solution(map, bridges, island_bridge_counts, index=0):
 
     (r1, c1), (r2, c2), orientation = bridges[index][:3]
     for planks in range(4):  # Try placing 0 to 3 planks
+        # Prune planks that would cross an already built bridge
+        if planks > 0 and conflicts is not None and \
+           any(bridges[k][3] > 0 for k in conflicts[index]):
+            break
+
         bridges[index] = ((r1, c1), (r2, c2), orientation, planks)
         update_bridge_counts(bridges, island_bridge_counts)
         
         if forward_check_and_arc_consistency(map, bridges, island_bridge_counts):
-            if search_for_solution(map, bridges, island_bridge_counts, index + 1):
+            if search_for_solution(map, bridges, island_bridge_counts, index + 1, conflicts, deadline):
                 return True
         
         # Revert bridge placement if the path does not lead to a solution
@@ -180,23 +223,264 @@ def search_for_solution(map, bridges, island_bridge_counts, index=0):
 
     return False  # No valid configuration found along this path
 
-def main():
+def sort_bridges(potential_bridges, island_degrees, conflicts):
     """
-    Main function to solve the Hashiwokakero puzzle.
+    Sorts bridges based on connectivity potential, renumbering the conflict
+    index so that it refers to positions in the sorted list.
+    """
+    order = sorted(range(len(potential_bridges)),
+                   key=lambda k: island_degrees[potential_bridges[k][0]]
+                               + island_degrees[potential_bridges[k][1]])
+    position = {k: i for i, k in enumerate(order)}
+    sorted_bridges = [potential_bridges[k] for k in order]
+    sorted_conflicts = [[position[j] for j in conflicts[k]] for k in order]
+    return sorted_bridges, sorted_conflicts
+
+def solve_backtrack(map, deadline=None):
+    """
+    Solves the puzzle with the original tuple-based backtracking search,
+    which prints the solution itself. Returns True if one was found.
     """
-    nrow, ncol, map = scan_map()
-    potential_bridges, island_degrees = identify_potential_bridges(map)
+    nrow, ncol = map.shape
+    potential_bridges, island_degrees, conflicts = identify_potential_bridges(map)
 
     # Sort bridges based on connectivity potential
-    potential_bridges.sort(key=lambda x: island_degrees[x[0]] + island_degrees[x[1]])
+    potential_bridges, conflicts = sort_bridges(potential_bridges, island_degrees, conflicts)
 
     modified_bridges = [(bridge[0], bridge[1], bridge[2], 0) for bridge in potential_bridges]
 
     # Initialize island_bridge_counts with 0 for each island
     island_bridge_counts = {(r, c): 0 for r in range(nrow) for c in range(ncol) if map[r, c] > 0}
 
-    if not search_for_solution(map, np.array(modified_bridges, dtype=object), island_bridge_counts):
+    return search_for_solution(map, np.array(modified_bridges, dtype=object),
+                               island_bridge_counts, conflicts=conflicts, deadline=deadline)
+
+def print_stats(stats, form):
+    """
+    Prints the search counters to stderr, as text or as one line of JSON.
+    """
+    if form == 'json':
+        print(json.dumps(stats.as_dict()), file=sys.stderr)
+    else:
+        for line in stats.report():
+            print(line, file=sys.stderr)
+
+def count_and_print(map, args):
+    """
+    Counts the solutions of one puzzle with the array engine, stopping at
+    args.count (2 checks that the solution is unique), and prints the count.
+    """
+    deadline = time.monotonic() + args.time_limit if args.time_limit > 0 else None
+    stats = None if args.stats is None else hashi_search.SearchStats()
+    try:
+        count = hashi_search.count_solutions(map, args.count, stats, deadline)
+    except hashi_search.SearchTimeout:
+        count = None
+        print("Timed out.")
+    if count == 0:
+        print("No solution found.")
+    elif count == args.count:
+        print("Solutions: %d or more" % count)
+    elif count is not None:
+        print("Solutions: %d%s" % (count, " (unique)" if count == 1 else ""))
+    if stats is not None:
+        print_stats(stats, args.stats)
+
+def solve_and_print(map, args, cache=None):
+    """
+    Solves one puzzle with the engine selected in args and prints the result.
+    With the array and sat engines, solutions are looked up in and added
+    to the given SolutionCache, if any. If args.stats is set, the search (or
+    SAT solver) counters are printed to stderr; the backtrack engine only
+    counts its nodes. With args.time_limit, the search gives up after that
+    many seconds and prints "Timed out." With args.count, the solutions are
+    counted instead (see count_and_print).
+    """
+    global search_nodes
+    if args.count is not None:
+        count_and_print(map, args)
+        return
+    deadline = time.monotonic() + args.time_limit if args.time_limit > 0 else None
+    if args.engine == 'backtrack':
+        search_nodes = 0
+        try:
+            solved = solve_backtrack(map, deadline)
+        except hashi_search.SearchTimeout:
+            solved = None
+            print("Timed out.")
+        if args.stats == 'json':
+            print(json.dumps({'nodes': search_nodes}), file=sys.stderr)
+        elif args.stats is not None:
+            print('nodes:       %d' % search_nodes, file=sys.stderr)
+        if solved is None:
+            return
+    elif args.engine in ('array', 'sat'):
+        stats = None
+        if args.stats is not None:
+            stats = hashi_search.SearchStats() if args.engine == 'array' else hashi_sat.SATStats()
+        bridges = None if cache is None else cache.get(map)
+        timed_out = False
+        if bridges is None:
+            try:
+                if args.engine == 'sat':
+                    bridges = hashi_sat.solve(map, stats, deadline)
+                else:
+                    state = hashi_search.solve(map, args.order, args.jobs, stats, args.split, deadline,
+                                               args.table)
+                    if state is not None:
+                        bridges = state.bridges()
+            except hashi_search.SearchTimeout:
+                timed_out = True
+            if bridges is not None and cache is not None:
+                cache.put(map, bridges)
+        solved = bridges is not None
+        if solved:
+            print_solution(map, bridges)
+        elif timed_out:
+            print("Timed out.")
+        if stats is not None:
+            print_stats(stats, args.stats)
+        if timed_out:
+            return
+    else:
+        print('Unknown Engine:',args.engine)
+        sys.exit(1)
+
+    if not solved:
         print("No solution found.")
 
+# Bridge orderings of the array engine (--order)
+ORDERS = ('static', 'dynamic')
+
+def make_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engine',type=str,default='array',
+                        help='array, sat or backtrack')
+    parser.add_argument('--order',type=str,default='dynamic',choices=ORDERS,
+                        help='static or dynamic bridge ordering (array engine)')
+    parser.add_argument('--jobs',type=int,default=1,
+                        help='worker processes for independent components, or for the top of the search tree (array engine)')
+    parser.add_argument('--split',type=int,default=None,
+                        help='branching bridges to enumerate before handing sub-problems to the --jobs workers (default: automatic)')
+    parser.add_argument('--table',type=int,default=0,
+                        help='slots of the table of failed states, a power of two (0 for none; array engine)')
+    parser.add_argument('--multi',action='store_true',default=False,
+                        help='solve every puzzle in the input, separated by blank lines')
+    parser.add_argument('--cache',type=str,default=None,
+                        help='file of cached solutions (array and sat engines)')
+    parser.add_argument('--count',type=int,default=None,
+                        help='count the solutions instead, stopping at this many (2 checks uniqueness)')
+    parser.add_argument('--time-limit',type=float,default=0,
+                        help='seconds allowed per puzzle (0 for no limit)')
+    parser.add_argument('--stats',type=str,nargs='?',const='text',default=None,
+                        help='print search counters to stderr, as text or json (only the nodes with the backtrack engine)')
+    parser.add_argument('--serve',action='store_true',default=False,
+                        help='answer JSON-lines requests on stdin (or --socket) instead')
+    parser.add_argument('--socket',type=str,default=None,
+                        help='Unix socket to serve requests on')
+    return parser
+
+def check_args(args):
+    """
+    Exits with a message if the options do not make sense.
+    """
+    if args.stats not in (None, 'text', 'json'):
+        print('Unknown Stats Format:',args.stats)
+        sys.exit(1)
+
+    # parse_args enforces the choices, but --serve requests bypass it
+    if args.order not in ORDERS:
+        print('Unknown Order:',args.order)
+        sys.exit(1)
+
+    check_search_args(args)
+
+def check_search_args(args):
+    """
+    Exits with a message if the --count or --table options, shared with
+    hashi_batch, do not make sense.
+    """
+    if args.count is not None and args.count < 1:
+        print('Count must be at least 1:',args.count)
+        sys.exit(1)
+
+    if args.table < 0 or args.table & (args.table - 1):
+        print('Table size must be 0 or a power of two:',args.table)
+        sys.exit(1)
+
+def solve_input(args, stream, cache=None):
+    """
+    Solves the puzzle, or with args.multi every puzzle, in the stream.
+    """
+    if args.multi:
+        for k, (nrow, ncol, map) in enumerate(scan_maps(stream)):
+            if k > 0:
+                print()
+            solve_and_print(map, args, cache)
+    else:
+        nrow, ncol, map = scan_map(stream)
+        solve_and_print(map, args, cache)
+
+def serve(args):
+    """
+    Answers solving requests from a long-lived process, so that the
+    interpreter, NumPy and the solver modules are loaded (and the cache
+    opened) only once. Each request is one line of JSON holding the puzzle
+    text ("puzzle", a string or a list of rows) and any command-line
+    options by name, e.g. {"puzzle": "...", "engine": "sat"}, plus an
+    optional "id" that is copied to the answer. Each answer is one line of
+    JSON holding what the solver printed ("output"), the counters it
+    printed to stderr ("stats"), or an "error", and the time taken in
+    seconds ("time"). Requests are read from stdin, or from connections to
+    the Unix socket args.socket, one at a time.
+    """
+    defaults = dict(vars(args))
+    for key in ('serve', 'socket', 'cache'):
+        del defaults[key]
+    cache = None if args.cache is None else SolutionCache(args.cache)
+
+    def handle(request):
+        if 'puzzle' not in request:
+            raise ValueError('missing puzzle')
+        puzzle = request['puzzle']
+        if not isinstance(puzzle, str):
+            puzzle = '\n'.join(puzzle)
+        options = line_server.request_options(request, defaults, ('puzzle',))
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            try:
+                check_args(options)
+                solve_input(options, io.BytesIO(puzzle.encode()), cache)
+            except SystemExit:
+                pass
+        if errors.getvalue():
+            return {'stats': errors.getvalue()}
+
+    try:
+        line_server.serve(handle, args.socket)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def main():
+    """
+    Main function to solve the Hashiwokakero puzzle.
+    """
+    args = make_parser().parse_args()
+    if args.serve:
+        serve(args)
+        return
+
+    check_args(args)
+    cache = None if args.cache is None else SolutionCache(args.cache)
+    try:
+        solve_input(args, sys.stdin, cache)
+    except ValueError as e:
+        print('Invalid Puzzle:',e)
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+
 if __name__ == "__main__":
     main()
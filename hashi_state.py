@@ -0,0 +1,341 @@
+# hashi_state.py
+import random
+
+import numpy as np
+
+class HashiState:
+    """
+    Compact solver state for a Hashiwokakero puzzle.
+
+    Islands are numbered 0..N-1 and candidate bridges 0..M-1. Each bridge has
+    a domain of plank counts [lo, hi]; each island keeps the sums of lo and hi
+    over its bridges. Everything the search changes is kept in flat integer
+    lists indexed by these numbers, and every domain change is pushed onto an
+    undo trail, so backtracking costs O(1) per change.
+
+    Each trail entry also records the decision levels the change follows
+    from, as a bit mask: the level of a decision itself, or the levels
+    behind the bounds it was derived from (the other bridges of an island,
+    or a crossing bridge). explain() combines them for the search, which
+    uses them to backjump.
+
+    self.hash is a Zobrist hash of the residual problem: the domain of every
+    open bridge, and the planks each island already has from its fixed
+    bridges. It is updated with a few XORs per domain change, and is the
+    same however the fixed bridges were decided.
+    """
+
+    MAX_PLANKS = 3
+
+    # Reasons for a contradiction, left in self.failure: an island sure to
+    # get more planks than its number, an island that can no longer get
+    # enough, and a bridge forced to zero by a crossing bridge it needs
+    FAILURES = ('capacity', 'demand', 'crossing')
+
+    def __init__(self, map, potential_bridges, conflicts):
+        """
+        Args:
+            map (np.array): 2D puzzle array, island numbers or 0 for water.
+            potential_bridges (list): Bridges as ((r1, c1), (r2, c2), orientation).
+            conflicts (list): For each bridge, the indices of the bridges it crosses.
+        """
+        self.map = map
+        self.potential_bridges = potential_bridges
+        self.conflicts = conflicts
+
+        # Number the islands in row-major order
+        self.islands = [(int(r), int(c)) for r, c in zip(*np.nonzero(map))]
+        self.island_number = {island: i for i, island in enumerate(self.islands)}
+        self.value = [int(map[r, c]) for r, c in self.islands]  # number on the island
+        self.adjacent = [[] for _ in self.islands]  # bridges at each island
+        self.sum_lo = [0] * len(self.islands)  # planks the island is sure to get
+        self.sum_hi = [0] * len(self.islands)  # planks the island could still get
+
+        # Bridge endpoints as island numbers, and plank domains
+        self.end1 = []
+        self.end2 = []
+        self.lo = []
+        self.hi = []
+        for b, (a1, a2, orientation) in enumerate(potential_bridges):
+            i = self.island_number[a1]
+            j = self.island_number[a2]
+            hi = min(self.MAX_PLANKS, self.value[i], self.value[j])
+            self.end1.append(i)
+            self.end2.append(j)
+            self.lo.append(0)
+            self.hi.append(hi)
+            self.adjacent[i].append(b)
+            self.adjacent[j].append(b)
+            self.sum_hi[i] += hi
+            self.sum_hi[j] += hi
+
+        # Zobrist keys for each domain [lo, hi] of each bridge (at lo * 4 + hi),
+        # and for each number of fixed planks at each island
+        rng = random.Random(3411)
+        size = self.MAX_PLANKS + 1
+        self.bridge_keys = [[rng.getrandbits(64) for _ in range(size * size)] for _ in self.lo]
+        self.island_keys = [[rng.getrandbits(64) for _ in range(size * len(self.adjacent[i]) + 1)]
+                            for i in range(len(self.islands))]
+        self.fixed = [0] * len(self.islands)  # planks from fixed bridges at each island
+        self.hash = 0
+        for b in range(len(self.lo)):
+            if self.lo[b] < self.hi[b]:
+                self.hash ^= self.bridge_keys[b][self.hi[b]]
+        for i in range(len(self.islands)):
+            self.hash ^= self.island_keys[i][0]
+
+        self.trail = []  # (bridge, old lo, old hi, levels mask, previous entry)
+        self.last = [-1] * len(self.lo)  # latest trail entry of each bridge
+        self.level = 0   # current decision level, set by the search
+        self.queue = []  # islands whose constraints must be re-examined
+        self.queued = [False] * len(self.islands)
+        self.nodes = 0   # search nodes visited
+        self.prunes = 0  # assignments refuted by propagation
+        self.failure = None  # reason for the last contradiction (see FAILURES)
+        self.failed = []     # bridges whose domains caused it
+
+    def is_fixed(self, b):
+        """
+        Returns True if the number of planks on bridge b is decided.
+        """
+        return self.lo[b] == self.hi[b]
+
+    def mark(self):
+        """
+        Returns the current trail position, to be passed to undo.
+        """
+        return len(self.trail)
+
+    def undo(self, mark):
+        """
+        Reverts every domain change made since the given trail position.
+        """
+        trail = self.trail
+        lo = self.lo
+        hi = self.hi
+        last = self.last
+        while len(trail) > mark:
+            b, old_lo, old_hi, _, previous = trail.pop()
+            last[b] = previous
+            self.rehash(b, lo[b], hi[b], old_lo, old_hi)
+            i = self.end1[b]
+            j = self.end2[b]
+            d_lo = old_lo - lo[b]
+            d_hi = old_hi - hi[b]
+            self.sum_lo[i] += d_lo
+            self.sum_lo[j] += d_lo
+            self.sum_hi[i] += d_hi
+            self.sum_hi[j] += d_hi
+            lo[b] = old_lo
+            hi[b] = old_hi
+        self.clear_queue()
+
+    def clear_queue(self):
+        """
+        Drops the islands still waiting for propagation.
+        """
+        for i in self.queue:
+            self.queued[i] = False
+        self.queue.clear()
+
+    def rehash(self, b, old_lo, old_hi, new_lo, new_hi):
+        """
+        Updates the hash for bridge b changing domain, in either direction.
+        An open bridge contributes its domain; a fixed one, its planks at
+        both of its islands.
+        """
+        keys = self.bridge_keys[b]
+        for lo, hi, sign in ((old_lo, old_hi, -1), (new_lo, new_hi, 1)):
+            if lo < hi:
+                self.hash ^= keys[lo * 4 + hi]
+            elif lo > 0:
+                for i in (self.end1[b], self.end2[b]):
+                    island_keys = self.island_keys[i]
+                    self.hash ^= island_keys[self.fixed[i]]
+                    self.fixed[i] += sign * lo
+                    self.hash ^= island_keys[self.fixed[i]]
+
+    def set_bounds(self, b, new_lo, new_hi, why=None):
+        """
+        Narrows the domain of bridge b to [new_lo, new_hi], recording the
+        change on the trail and scheduling both endpoints for propagation.
+        `why` is the mask of decision levels the change follows from, by
+        default the current level (a decision). Returns False if the domain
+        becomes empty.
+        """
+        old_lo = self.lo[b]
+        old_hi = self.hi[b]
+        if new_lo < old_lo:
+            new_lo = old_lo
+        if new_hi > old_hi:
+            new_hi = old_hi
+        if new_lo > new_hi:
+            self.failed = [b]
+            return False
+        if new_lo == old_lo and new_hi == old_hi:
+            return True
+
+        if why is None:
+            why = 1 << self.level
+        previous = self.last[b]
+        if previous >= 0:
+            why |= self.trail[previous][3]
+        self.trail.append((b, old_lo, old_hi, why, previous))
+        self.last[b] = len(self.trail) - 1
+        self.rehash(b, old_lo, old_hi, new_lo, new_hi)
+        self.lo[b] = new_lo
+        self.hi[b] = new_hi
+        for i in (self.end1[b], self.end2[b]):
+            self.sum_lo[i] += new_lo - old_lo
+            self.sum_hi[i] += new_hi - old_hi
+            if not self.queued[i]:
+                self.queued[i] = True
+                self.queue.append(i)
+
+        # A bridge that is sure to be built rules out every bridge it crosses
+        if old_lo == 0 and new_lo > 0:
+            for k in self.conflicts[b]:
+                if not self.set_bounds(k, 0, 0, why):
+                    self.failure = 'crossing'
+                    self.failed = [k, b]
+                    return False
+        return True
+
+    def propagate(self):
+        """
+        Applies the island constraints until nothing changes. For each island
+        with number v, each of its bridges must supply at least v minus what
+        the other bridges could supply, and at most v minus what the other
+        bridges are sure to supply. This forces every bridge of an island whose
+        demand equals its capacity, and caps at zero the bridges of an island
+        that is already saturated. Returns False on a contradiction, with
+        its reason in self.failure.
+        """
+        queue = self.queue
+        queued = self.queued
+        lo = self.lo
+        hi = self.hi
+        while queue:
+            i = queue.pop()
+            queued[i] = False
+            v = self.value[i]
+            if self.sum_lo[i] > v or self.sum_hi[i] < v:
+                self.failure = 'capacity' if self.sum_lo[i] > v else 'demand'
+                self.failed = self.adjacent[i]
+                self.clear_queue()
+                return False
+            why = None
+            for b in self.adjacent[i]:
+                if lo[b] == hi[b]:
+                    continue
+                # Read the sums afresh: earlier bridges may have changed them
+                new_lo = v - (self.sum_hi[i] - hi[b])
+                new_hi = v - (self.sum_lo[i] - lo[b])
+                if new_lo > lo[b] or new_hi < hi[b]:
+                    if why is None:
+                        why = self.explain(self.adjacent[i])
+                    if not self.set_bounds(b, new_lo, new_hi, why):
+                        self.clear_queue()
+                        return False
+        return True
+
+    def explain(self, bridges):
+        """
+        Returns the mask of decision levels (bit k for level k) whose
+        decisions led to the current domains of the given bridges, e.g.
+        of self.failed after a contradiction.
+        """
+        trail = self.trail
+        last = self.last
+        why = 0
+        for b in bridges:
+            if last[b] >= 0:
+                why |= trail[last[b]][3]
+        return why
+
+    def assign(self, b, planks):
+        """
+        Places the given number of planks on bridge b and propagates.
+        Returns False on a contradiction; the caller undoes to its mark.
+        """
+        return self.set_bounds(b, planks, planks) and self.propagate()
+
+    def is_feasible(self):
+        """
+        Propagates the constraints of every island, e.g. before the search starts.
+        """
+        for i in range(len(self.islands)):
+            if not self.queued[i]:
+                self.queued[i] = True
+                self.queue.append(i)
+        return self.propagate()
+
+    def components(self, scope=None):
+        """
+        Splits the unfixed bridges into independent components. Two unfixed
+        bridges are in the same component if they share an island or cross
+        each other, directly or through a chain of such bridges; fixed
+        bridges only contribute constants and do not link anything. The
+        components can therefore be solved one after another (or in
+        parallel) without ever backtracking from one into another.
+        With a scope (itself a component, or a list of them) only the
+        bridges in it are split.
+        Returns a list of lists of bridge indices.
+        """
+        lo = self.lo
+        hi = self.hi
+        bridges = range(len(lo)) if scope is None else scope
+
+        # Union-find over the unfixed bridges
+        parent = {b: b for b in bridges if lo[b] < hi[b]}
+
+        def find(b):
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            return b
+
+        def union(a, b):
+            a = find(a)
+            b = find(b)
+            if a != b:
+                parent[b] = a
+
+        for b in parent:
+            for i in (self.end1[b], self.end2[b]):
+                for k in self.adjacent[i]:
+                    if k != b and lo[k] < hi[k]:
+                        union(b, k)
+            for k in self.conflicts[b]:
+                if lo[k] < hi[k]:
+                    union(b, k)
+
+        groups = {}
+        for b in parent:
+            groups.setdefault(find(b), []).append(b)
+        return list(groups.values())
+
+    def region_hash(self, scope):
+        """
+        Returns a Zobrist hash of the residual problem of one component: the
+        domains of its bridges and the planks its islands already have. Two
+        components with the same hash have the same solutions, however the
+        rest of the puzzle was decided.
+        """
+        h = 0
+        islands = set()
+        for b in scope:
+            h ^= self.bridge_keys[b][self.lo[b] * 4 + self.hi[b]]
+            islands.add(self.end1[b])
+            islands.add(self.end2[b])
+        for i in islands:
+            h ^= self.island_keys[i][self.fixed[i]]
+        return h
+
+    def bridges(self):
+        """
+        Returns the bridges as ((r1, c1), (r2, c2), orientation, planks) tuples,
+        the format used by print_solution.
+        """
+        return [(a1, a2, orientation, self.lo[b])
+                for b, (a1, a2, orientation) in enumerate(self.potential_bridges)]
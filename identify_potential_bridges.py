@@ -11,8 +11,10 @@ def identify_potential_bridges(map):
                         that island, or 0 for water.
 
     Returns:
-        tuple: A tuple containing a list of potential bridges and a dictionary
-               mapping each island to its maximum number of connectable bridges.
+        tuple: A tuple containing a list of potential bridges, a dictionary
+               mapping each island to its maximum number of connectable bridges,
+               and a conflict index: for each potential bridge, the list of
+               indices of the potential bridges it crosses.
     """
     nrow, ncol = map.shape
     potential_bridges = []  # To store the coordinates and direction of potential bridges
@@ -48,18 +50,153 @@ def identify_potential_bridges(map):
                 # Update the island's degree (max possible connections)
                 island_degrees[(r, c)] = min(possible_connections, max_bridges)
 
-    return potential_bridges, island_degrees
+    conflicts = identify_bridge_conflicts(potential_bridges)
+
+    return potential_bridges, island_degrees, conflicts
+
+def identify_bridge_conflicts(potential_bridges):
+    """
+    Build the conflict index for a list of potential bridges.
+
+    A horizontal and a vertical bridge conflict when they pass through the
+    same water cell, so at most one of them can carry planks.
+
+    Args:
+        potential_bridges (list): Bridges as ((r1, c1), (r2, c2), orientation).
+
+    Returns:
+        list: For each bridge, the list of indices of the bridges it crosses.
+    """
+    conflicts = [[] for _ in potential_bridges]
+
+    # Record which horizontal bridge spans each water cell
+    horizontal_cells = {}
+    for k, ((r1, c1), (r2, c2), orientation) in enumerate(potential_bridges):
+        if orientation == 'H':
+            for c in range(c1 + 1, c2):
+                horizontal_cells[(r1, c)] = k
+
+    # Any vertical bridge passing through one of those cells crosses it
+    for k, ((r1, c1), (r2, c2), orientation) in enumerate(potential_bridges):
+        if orientation == 'V':
+            for r in range(r1 + 1, r2):
+                h = horizontal_cells.get((r, c1))
+                if h is not None:
+                    conflicts[k].append(h)
+                    conflicts[h].append(k)
+
+    return conflicts
+
+def identify_potential_bridges_np(map):
+    """
+    Vectorised version of identify_potential_bridges for large grids.
+
+    The nearest island to the east of every cell is found with a reverse
+    cumulative minimum of island column indices along each row, and the
+    nearest island to the south likewise along each column, so no Python
+    code runs per cell.
+
+    Args:
+        map (np.array): 2D array representing the Hashiwokakero puzzle.
+
+    Returns:
+        tuple: (ends, orientation, degrees, crossings), where ends is an
+               (M, 4) array of (r1, c1, r2, c2) per potential bridge, in the
+               same order as identify_potential_bridges; orientation is an
+               (M,) array of 'H' or 'V'; degrees has the shape of the map and
+               holds each island's maximum number of connectable bridges; and
+               crossings is a (K, 2) array of (vertical, horizontal) index
+               pairs of bridges that cross.
+    """
+    nrow, ncol = map.shape
+    island = map > 0
+
+    # Column of the nearest island strictly east of each cell (ncol if none)
+    col = np.where(island, np.arange(ncol)[None, :], ncol)
+    nearest = np.minimum.accumulate(col[:, ::-1], axis=1)[:, ::-1]
+    east = np.full(map.shape, ncol)
+    east[:, :-1] = nearest[:, 1:]
+
+    # Row of the nearest island strictly south of each cell (nrow if none)
+    row = np.where(island, np.arange(nrow)[:, None], nrow)
+    nearest = np.minimum.accumulate(row[::-1, :], axis=0)[::-1, :]
+    south = np.full(map.shape, nrow)
+    south[:-1, :] = nearest[1:, :]
+
+    # Each island's horizontal bridge comes before its vertical one
+    r, c = np.nonzero(island)
+    e = east[r, c]
+    s = south[r, c]
+    present = np.stack([e < ncol, s < nrow], axis=1)
+    ends = np.stack([np.stack([r, c, r, e], axis=1),
+                     np.stack([r, c, s, c], axis=1)], axis=1)[present]
+    vertical = np.broadcast_to([False, True], present.shape)[present]
+    orientation = np.where(vertical, 'V', 'H')
+
+    degrees = np.zeros(map.shape, dtype=map.dtype)
+    degrees[r, c] = np.minimum(present.sum(axis=1), map[r, c])
+
+    # Label every water cell spanned by a horizontal bridge with its index,
+    # then look up the cells spanned by the vertical bridges
+    h = np.nonzero(~vertical)[0]
+    v = np.nonzero(vertical)[0]
+    owner = np.full(map.shape, -1)
+    cells_r, cells_c, spans = _spanned_cells(ends[h, 0], ends[h, 1], ends[h, 3], False)
+    owner[cells_r, cells_c] = np.repeat(h, spans)
+    cells_r, cells_c, spans = _spanned_cells(ends[v, 1], ends[v, 0], ends[v, 2], True)
+    crossed = owner[cells_r, cells_c]
+    hit = crossed >= 0
+    crossings = np.stack([np.repeat(v, spans)[hit], crossed[hit]], axis=1)
+
+    return ends, orientation, degrees, crossings
+
+def _spanned_cells(fixed, start, end, vertical):
+    """
+    Returns the (rows, cols) of the water cells strictly between start and
+    end along a row (or a column if vertical), and the span of each bridge.
+    """
+    spans = end - start - 1
+    offsets = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    along = np.repeat(start, spans) + 1 + offsets
+    across = np.repeat(fixed, spans)
+    if vertical:
+        return along, across, spans
+    return across, along, spans
+
+def identify_potential_bridges_fast(map):
+    """
+    Same results as identify_potential_bridges, computed with
+    identify_potential_bridges_np and converted to lists and dictionaries.
+    """
+    ends, orientation, degrees, crossings = identify_potential_bridges_np(map)
+    r1, c1, r2, c2 = ends.T.tolist()
+    potential_bridges = list(zip(zip(r1, c1), zip(r2, c2), orientation.tolist()))
+
+    r, c = np.nonzero(map > 0)
+    island_degrees = dict(zip(zip(r.tolist(), c.tolist()), degrees[r, c].tolist()))
+
+    # Group the crossing pairs in both directions by bridge; a stable sort
+    # keeps each list in the order identify_bridge_conflicts produces
+    pairs = np.concatenate([crossings, crossings[:, ::-1]])
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    crossed = pairs[:, 1].tolist()
+    stops = np.cumsum(np.bincount(pairs[:, 0], minlength=len(potential_bridges))).tolist()
+    starts = [0] + stops[:-1]
+    conflicts = [crossed[a:b] for a, b in zip(starts, stops)]
+
+    return potential_bridges, island_degrees, conflicts
 
 def main():
     """
     Main function to load the puzzle map, identify potential bridges, and display them.
     """
     nrow, ncol, map = scan_map()  # Load the puzzle map
-    potential_bridges, island_degrees = identify_potential_bridges(map)
+    potential_bridges, island_degrees, conflicts = identify_potential_bridges(map)
     
     # Output potential bridges and their respective degrees
     print("Potential Bridges:", potential_bridges)
     print("Island Degrees:", island_degrees)
+    print("Conflicts:", conflicts)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,84 @@
+# line_server.py
+# Answers requests given as lines of JSON, from a long-lived process;
+# used by the --serve modes of hashi_solver.py and path_search/search.py.
+import argparse
+import contextlib
+import io
+import json
+import os
+import socketserver
+import stat
+import sys
+import time
+
+def request_options(request, defaults, fields=()):
+    """
+    Returns the options of a request, over the given defaults, as an
+    argparse.Namespace like the one parse_args would give. The "id" and
+    the given fields are not options. Raises ValueError naming any option
+    that is not among the defaults.
+    """
+    options = {key: value for key, value in request.items() if key != 'id' and key not in fields}
+    unknown = sorted(set(options) - set(defaults))
+    if unknown:
+        raise ValueError('unknown options: ' + ', '.join(unknown))
+    return argparse.Namespace(**dict(defaults, **options))
+
+def answer(line, handle):
+    """
+    Answers one request line. handle is called with the request (a dict)
+    and what it prints becomes the "output" of the answer; it may return a
+    dict of more fields to add. A SystemExit from handle ends the request
+    normally, as the programs exit after printing some results and errors.
+    Any other exception becomes the "error" of the answer. The request's
+    "id", if any, is copied, and the time taken in seconds is added as
+    "time". Returns the answer as one line of JSON.
+    """
+    start = time.perf_counter()
+    request = {}
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError('a request must be a JSON object')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                fields = handle(request)
+            except SystemExit:
+                fields = None
+        response = {'output': output.getvalue()}
+        if fields:
+            response.update(fields)
+    except Exception as e:
+        response = {'error': str(e)}
+    if isinstance(request, dict) and 'id' in request:
+        response['id'] = request['id']
+    response['time'] = round(time.perf_counter() - start, 6)
+    return json.dumps(response)
+
+def serve(handle, socket_path=None):
+    """
+    Answers request lines (see answer) read from stdin, or from connections
+    to the Unix socket at socket_path, one connection at a time.
+    """
+    if socket_path is None:
+        for line in sys.stdin:
+            if line.strip():
+                print(answer(line, handle), flush=True)
+        return
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write(answer(line, handle).encode() + b'\n')
+                    self.wfile.flush()
+
+    # Replace a socket left behind by an earlier server
+    if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+        os.unlink(socket_path)
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
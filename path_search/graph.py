@@ -29,6 +29,9 @@ adjacent = {
 heuristic = {'A':9,'B':7,'C':7,'D':7,'E':4,'F':3,'G':0,
              'S':9,'T':8,'U':7,'V':7,'W':2,'X':5,'Y':5,'Z':1}
 
+# the goal the heuristic above estimates the distance to
+heuristic_goal = 'G'
+
 class State:
 
     goal = 'G'
@@ -49,6 +52,18 @@ class State:
     def is_equal_to(self,other):
         return(self.a == other.a)
 
+    def key(self):
+        return self.a
+
+    def goal_for(self):
+        return State(State.goal)
+
+    def reverse_action(self,action):
+        return action
+
+    def heuristic_fits(self):
+        return State.goal == heuristic_goal
+
     def expand( self ):
         children = []
         for (state,cost) in adjacent[self.a]:
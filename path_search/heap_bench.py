@@ -0,0 +1,107 @@
+#**********************************************************************
+#   heap_bench.py
+#
+#   Compare MyHeap with IndexedHeap as the priority queue of A* on
+#   scrambled sliding tile puzzles:
+#
+#   python3 heap_bench.py --rows 3 --d 60 --n 5
+#
+#   Both runs are graph searches over the same starts. With MyHeap a
+#   node reached more cheaply is pushed again and the old entry is
+#   skipped when it is popped; with IndexedHeap the queued entry is
+#   replaced (decrease-key). The total time and the time spent in the
+#   heap, pushes, pops, stale pops and the largest heap size are
+#   printed for each.
+#
+import argparse
+import random
+import time
+
+from node_heap import Node, MyHeap, IndexedHeap
+from sliding import State
+
+#**********************************************************************
+#  Return a start state d moves from the goal, never undoing a move.
+#
+def scramble( rows, d, rng ):
+    state = State.goal_state(rows)
+    previous = None
+    for k in range(d):
+        children = [child for (child,act,cost) in state.expand()
+                    if previous is None or not child.is_equal_to(previous)]
+        previous = state
+        state = rng.choice(children)
+    return state
+
+#**********************************************************************
+#  Run A* from start with the given heap class. Return the counts.
+#
+def astar( start, heap_class ):
+    counts = {'heap time': 0, 'pushes': 1, 'pops': 0, 'stale': 0, 'max size': 1}
+    indexed = heap_class is IndexedHeap
+    heap = heap_class() if indexed else heap_class('astar')
+    root = Node(start,None,None,0,0,'astar')
+    best_g = {start.key(): 0}
+    if indexed:
+        heap.insert(root,start.key())
+    else:
+        heap.insert(root)
+    while heap.size > 0:
+        begin = time.perf_counter()
+        node = heap.remove_min()
+        counts['heap time'] += time.perf_counter() - begin
+        counts['pops'] += 1
+        if node.g > best_g[node.state.key()]:
+            counts['stale'] += 1
+            continue
+        if node.state.is_goal():
+            counts['cost'] = node.g
+            return counts
+        for (state,act,cost) in node.state.expand():
+            key = state.key()
+            g = node.g + cost
+            if key in best_g and best_g[key] <= g:
+                continue
+            best_g[key] = g
+            child = Node(state,node,act,node.depth+1,g,'astar')
+            begin = time.perf_counter()
+            if indexed:
+                heap.insert(child,key)
+            else:
+                heap.insert(child)
+            counts['heap time'] += time.perf_counter() - begin
+            counts['pushes'] += 1
+        counts['max size'] = max(counts['max size'], heap.size)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=3,
+                        help='rows (and cols) of the sliding tile puzzle')
+    parser.add_argument('--d',type=int,default=60,
+                        help='scrambling moves from the goal')
+    parser.add_argument('--n',type=int,default=5,
+                        help='number of puzzles')
+    parser.add_argument('--seed',type=int,default=1,
+                        help='random seed for the starts')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    starts = [scramble(args.rows,args.d,rng) for k in range(args.n)]
+    print('%-12s %8s %9s %9s %9s %9s %9s %6s' % ('heap','time','heap time','pushes','pops','stale',
+                                                'max size','cost'))
+    for heap_class in (MyHeap, IndexedHeap):
+        total = {}
+        elapsed = 0
+        for start in starts:
+            begin = time.perf_counter()
+            counts = astar(start,heap_class)
+            elapsed += time.perf_counter() - begin
+            for name, count in counts.items():
+                total[name] = total.get(name,0) + count
+        print('%-12s %8.2f %9.2f %9d %9d %9d %9d %6d' % (heap_class.__name__, elapsed, total['heap time'],
+              total['pushes'], total['pops'], total['stale'], total['max size'], total['cost']))
+
+
+if __name__ == '__main__':
+    main()
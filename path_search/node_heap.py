@@ -6,11 +6,12 @@
 #   This code provides the Node and Heap classes which are used
 #   by the path search algorithms implemented in search.py
 #
+import sys
 
 class Node:
 
     tick = 0
-    printed = []
+    printed = set()   # keys of the states printed with --unique
 
     def __init__(self, state, parent=None, action=None,
                  depth=0, g=0, strategy='bfs', weight=1 ):
@@ -30,13 +31,13 @@ class Node:
             return  self.g
         elif strategy == 'greedy':
             return  self.state.h
-        elif strategy == 'astar':
+        elif strategy == 'astar' or strategy == 'idastar':
             return self.g + self.state.h
         elif strategy == 'heuristic':
             return (2-weight)*self.g + weight*self.state.h
         else:
             print('Unknown Strategy: ',strategy)
-            exit( 1 )
+            sys.exit(1)
 
     def print_state(self):
         for k in range(self.depth):
@@ -54,15 +55,15 @@ class Node:
 
     def print_node_ghf(self,args,unique=False):
         if unique:
-            for state in Node.printed:
-                if self.state.is_equal_to(state):
-                    return
-            Node.printed.append(self.state)
+            key = self.state.key()
+            if key in Node.printed:
+                return
+            Node.printed.add(key)
         self.print_state()
-        if args.s == 'ucs' or args.s == 'astar' or args.s == 'heuristic':
+        if args.s in ('ucs','astar','heuristic','idastar'):
             print(' (g:',end='')
             print(self.g,end='')
-            if args.s == 'astar' or args.s == 'heuristic':
+            if args.s in ('astar','heuristic','idastar'):
                 print(', h:',end='')
                 print(self.state.h,end='')
                 print(', f:',end='')
@@ -131,3 +132,77 @@ class MyHeap:
         self.sift_down(1)
         return root
 
+
+#**********************************************************************
+#   Priority Queue implemented as an indexed binary heap. Each entry is
+#   a tuple (cost, num, node, key), so entries compare as plain tuples
+#   and, num being unique, ties go to the node generated earlier.
+#   A node inserted with a state key replaces the entry already held
+#   for that key, if any, which is moved up or down to its new place
+#   (decrease-key); the position of every keyed entry is kept in pos
+#   for this. The heap therefore never holds a stale entry for a key,
+#   and the caller decides when a node is better than the one queued.
+#
+class IndexedHeap:
+    def __init__(self):
+        self.a = []
+        self.pos = {}     # key -> index in a
+        self.size = 0
+
+    def __contains__(self,key):
+        return key in self.pos
+
+    def place(self,i,entry):
+        self.a[i] = entry
+        if entry[3] is not None:
+            self.pos[entry[3]] = i
+
+    def sift_up(self,i,entry):
+        a = self.a
+        while i > 0:
+            parent = (i-1)//2
+            if entry >= a[parent]:
+                break
+            self.place(i,a[parent])
+            i = parent
+        self.place(i,entry)
+
+    def sift_down(self,i,entry):
+        a = self.a
+        n = self.size
+        while True:
+            child = 2*i + 1
+            if child >= n:
+                break
+            if child+1 < n and a[child+1] < a[child]:
+                child += 1
+            if entry <= a[child]:
+                break
+            self.place(i,a[child])
+            i = child
+        self.place(i,entry)
+
+    def insert(self,n,key=None):
+        entry = (n.cost, n.num, n, key)
+        if key is not None and key in self.pos:
+            i = self.pos[key]
+            if entry < self.a[i]:
+                self.sift_up(i,entry)
+            else:
+                self.sift_down(i,entry)
+            return
+        self.a.append(entry)
+        self.size += 1
+        self.sift_up(self.size-1,entry)
+
+    def remove_min(self):
+        if self.size == 0:
+            return None
+        root = self.a[0]
+        last = self.a.pop()
+        self.size -= 1
+        if root[3] is not None:
+            del self.pos[root[3]]
+        if self.size > 0:
+            self.sift_down(0,last)
+        return root[2]
@@ -0,0 +1,230 @@
+#**********************************************************************
+#   pattern_db.py
+#
+#   Additive pattern databases for the 4x4 sliding tile puzzle.
+#   The tiles are split into disjoint patterns (6-6-3 by default).
+#   For each pattern, a table gives the number of moves of its own
+#   tiles needed to bring them home from any placement, ignoring the
+#   other tiles and the blank. Each move shifts one tile, so the sum
+#   over the patterns never overestimates, and it is much closer than
+#   the Manhattan distance.
+#
+#   The tables are built once, by a breadth-first search backwards
+#   from the goal, and saved as one byte per placement:
+#
+#   python3 pattern_db.py --build
+#   python3 pattern_db.py --report --d 60 --n 5
+#   python3 search.py --env packed --heuristic pdb --s astar --d 60
+#
+#   They are loaded with mmap, so loading is instant and processes
+#   using the same tables share their pages.
+#
+import argparse
+import mmap
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+SIDE = 4
+CELLS = SIDE*SIDE
+
+PARTITIONS = {
+    '6-6-3': ((1,2,5,6,9,10), (3,4,7,8,11,12), (13,14,15)),
+    '5-5-5': ((1,2,5,6,9), (3,4,7,8,12), (10,11,13,14,15)),
+}
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb_tables')
+
+# (directory, partition) -> AdditivePDB, loaded on first use
+loaded = {}
+
+#**********************************************************************
+#  Placements of m distinct tiles are numbered in mixed radix: the
+#  i-th tile's cell, counted among the cells not taken by the tiles
+#  before it, is a digit in base CELLS-i.
+#
+def table_size( m ):
+    size = 1
+    for i in range(m):
+        size *= CELLS-i
+    return size
+
+def rank_array( cells ):
+    index = np.zeros(len(cells), dtype=np.int64)
+    for i in range(cells.shape[1]):
+        digit = cells[:,i].astype(np.int64)
+        for j in range(i):
+            digit -= cells[:,j] < cells[:,i]
+        index = index*(CELLS-i) + digit
+    return index
+
+#**********************************************************************
+#  Return the table of one pattern, as a numpy array of bytes.
+#
+def build_table( tiles ):
+    m = len(tiles)
+    dist = np.full(table_size(m), 255, dtype=np.uint8)
+    frontier = np.array([[t-1 for t in tiles]], dtype=np.int8)  # home cells
+    dist[rank_array(frontier)] = 0
+    level = 0
+    while len(frontier) > 0:
+        found = []
+        row = frontier // SIDE
+        col = frontier % SIDE
+        for i in range(m):
+            for (dr,dc) in ((1,0),(0,1),(0,-1),(-1,0)):
+                r = row[:,i] + dr
+                c = col[:,i] + dc
+                valid = (r >= 0) & (r < SIDE) & (c >= 0) & (c < SIDE)
+                cell = r*SIDE + c
+                for j in range(m):
+                    if j != i:
+                        valid &= frontier[:,j] != cell
+                moved = frontier[valid]
+                moved[:,i] = cell[valid]
+                index = rank_array(moved)
+                new = dist[index] == 255
+                index, first = np.unique(index[new], return_index=True)
+                dist[index] = level + 1
+                found.append(moved[new][first])
+        frontier = np.concatenate(found)
+        level += 1
+    return dist
+
+def table_path( directory, tiles ):
+    return os.path.join(directory, 'pdb_4x4_' + '-'.join(str(t) for t in tiles) + '.bin')
+
+def build( directory=DEFAULT_DIR, partition='6-6-3' ):
+    os.makedirs(directory, exist_ok=True)
+    for tiles in PARTITIONS[partition]:
+        start = time.perf_counter()
+        table = build_table(tiles)
+        table.tofile(table_path(directory, tiles))
+        print('pattern',tiles,':',len(table),'entries, max',int(table.max()),
+              'moves, %.1f s' % (time.perf_counter() - start))
+
+class AdditivePDB:
+
+    def __init__(self, directory=DEFAULT_DIR, partition='6-6-3'):
+        self.patterns = PARTITIONS[partition]
+        self.pattern_of = [None]*CELLS   # tile -> its pattern
+        self.tables = []
+        for p, tiles in enumerate(self.patterns):
+            for t in tiles:
+                self.pattern_of[t] = p
+            path = table_path(directory, tiles)
+            if not os.path.exists(path):
+                raise FileNotFoundError('no pattern database ' + path
+                                        + ' (build it with: python3 pattern_db.py --build)')
+            with open(path, 'rb') as f:
+                self.tables.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    #  where packs the cell of each tile t into bits 4t..4t+3
+    def part( self, p, where ):
+        index = 0
+        seen = []
+        for i, t in enumerate(self.patterns[p]):
+            cell = (where >> (4*t)) & 15
+            digit = cell
+            for s in seen:
+                if s < cell:
+                    digit -= 1
+            index = index*(CELLS-i) + digit
+            seen.append(cell)
+        return self.tables[p][index]
+
+    def parts( self, where ):
+        return [self.part(p, where) for p in range(len(self.patterns))]
+
+def load( directory=None, partition='6-6-3' ):
+    if directory is None:
+        directory = DEFAULT_DIR
+    if (directory, partition) not in loaded:
+        loaded[(directory, partition)] = AdditivePDB(directory, partition)
+    return loaded[(directory, partition)]
+
+#**********************************************************************
+#  Pack the cell of each tile, given the tile in each cell.
+#
+def where_of( tiles ):
+    where = 0
+    for k, t in enumerate(tiles):
+        where |= k << (4*int(t))
+    return where
+
+#**********************************************************************
+#  Report the nodes expanded by A* (graph search) from scrambled
+#  starts, with the Manhattan distance and with the databases.
+#
+def report( args ):
+    from node_heap import Node, IndexedHeap
+    from sliding_packed import State
+
+    def astar( start ):
+        heap = IndexedHeap()
+        heap.insert(Node(start,None,None,0,0,'astar'),start.key())
+        best_g = {start.key(): 0}
+        expanded = 0
+        while heap.size > 0:
+            node = heap.remove_min()
+            expanded += 1
+            if node.state.is_goal():
+                return expanded, node.g
+            for (state,act,cost) in node.state.expand():
+                key = state.key()
+                if key in best_g and best_g[key] <= node.g + cost:
+                    continue
+                best_g[key] = node.g + cost
+                heap.insert(Node(state,node,act,node.depth+1,node.g+cost,'astar'),key)
+
+    rng = random.Random(args.seed)
+    print('%5s %6s %12s %8s %12s %8s' % ('start','cost','manhattan','time','pdb','time'))
+    for n in range(args.n):
+        State.set_heuristic('manhattan')
+        state = State.goal_state(SIDE)
+        previous = None
+        for k in range(args.d):     # random walk, never undoing a move
+            children = [child for (child,act,cost) in state.expand() if child != previous]
+            previous = state
+            state = rng.choice(children)
+        tiles = [state.tile(k) for k in range(CELLS)]
+        results = []
+        for name in ('manhattan', 'pdb'):
+            State.set_heuristic(name, args.dir, args.partition)
+            begin = time.perf_counter()
+            expanded, cost = astar(State.from_array(tiles,SIDE,SIDE))
+            results += [expanded, time.perf_counter() - begin]
+        print('%5d %6d %12d %8.2f %12d %8.2f' % (n+1, cost, *results))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--build',action='store_true',default=False,
+                        help='build the pattern databases')
+    parser.add_argument('--report',action='store_true',default=False,
+                        help='compare nodes expanded with the Manhattan distance')
+    parser.add_argument('--dir',type=str,default=DEFAULT_DIR,
+                        help='directory of the pattern databases')
+    parser.add_argument('--partition',type=str,default='6-6-3',
+                        help='6-6-3 or 5-5-5')
+    parser.add_argument('--d',type=int,default=50,
+                        help='depth of the random starts for --report')
+    parser.add_argument('--n',type=int,default=5,
+                        help='number of starts for --report')
+    parser.add_argument('--seed',type=int,default=1,
+                        help='random seed for --report')
+    args = parser.parse_args()
+
+    if args.partition not in PARTITIONS:
+        print('Unknown Partition:',args.partition)
+        sys.exit(1)
+    if args.build:
+        build(args.dir, args.partition)
+    if args.report:
+        report(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -39,6 +39,9 @@ heuristic = {
     'oradea':380,'pitesti':98,'rimnicu vilcea':193,'sibiu':253,
     'timisoara':329,'urziceni':80,'vaslui':199,'zerind':374}
 
+# the goal the heuristic above estimates the distance to
+heuristic_goal = 'bucharest'
+
 class State:
 
     goal = 'bucharest'
@@ -59,6 +62,18 @@ class State:
     def is_equal_to(self,other):
         return(self.a == other.a)
 
+    def key(self):
+        return self.a
+
+    def goal_for(self):
+        return State(State.goal)
+
+    def reverse_action(self,action):
+        return action
+
+    def heuristic_fits(self):
+        return State.goal == heuristic_goal
+
     def expand( self ):
         children = []
         for (state,cost) in adjacent[self.a]:
@@ -8,20 +8,36 @@
 import numpy as np
 import random
 import argparse
+import os
+import sys
 
-from node_heap import Node, MyHeap
+from node_heap import Node, IndexedHeap
 
+# line_server.py, shared with hashi_solver.py, is in the directory above
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import line_server
 
-def main():
+ENVIRONMENTS = ('sliding', 'packed', 'romania', 'graph')
+
+# Bidirectional strategies, and the strategy each side's heap follows
+BIDIRECTIONAL = {'bidir': 'ucs', 'bidir-bfs': 'bfs', 'bidir-astar': 'astar'}
+
+
+def make_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument('--s',type=str,default='bfs',
-                        help= 'bfs,bfs1,ucs,dfs,greedy,astar or heuristic')
+                        help= 'bfs,bfs1,ucs,dfs,greedy,astar,heuristic,idastar, '
+                              'or bidir, bidir-bfs, bidir-astar (bidirectional ucs, bfs, astar)')
     parser.add_argument('--id',action='store_true',default=False,
                         help='iterative deepening')
     parser.add_argument('--w',type=float,default=1.0,
                         help='weight for heuristic search')
+    parser.add_argument('--heuristic',type=str,default='manhattan',
+                        help='manhattan or pdb (4x4 sliding tile puzzle, see pattern_db.py)')
+    parser.add_argument('--pdb-dir',type=str,default=None,
+                        help='directory of the pattern databases')
     parser.add_argument('--env',type=str,default='sliding',
-                        help='sliding, romania or graph')
+                        help='sliding, packed (sliding, faster, up to 16 cells), romania or graph')
     parser.add_argument('--rows',type=int,default=4,
                         help='rows in sliding tile puzzle')
     parser.add_argument('--cols',type=int,default=0,
@@ -35,17 +51,53 @@ def main():
                         help='print each expanded state only once')
     parser.add_argument('--shuffle',action='store_true',default=False,
                         help='shuffle generated nodes in random order')
-    args = parser.parse_args()
+    parser.add_argument('--graph',action='store_true',default=False,
+                        help='graph search: drop states already reached at no greater cost')
+    parser.add_argument('--serve',action='store_true',default=False,
+                        help='answer JSON-lines requests on stdin (or --socket)')
+    parser.add_argument('--socket',type=str,default=None,
+                        help='Unix socket to serve requests on')
+    return parser
+
+def main():
+    args = make_parser().parse_args()
+    if args.serve:
+        serve(args.socket)
+    else:
+        run(args)
 
-    if args.env == 'sliding':
+#**********************************************************************
+#  Return the State class of the named environment, or None.
+#  The packed environment is the sliding tile puzzle packed into
+#  integers (see sliding_packed.py).
+#
+def get_state_class( env ):
+    if env == 'sliding':
         from sliding import State
-    elif args.env == 'romania':
+    elif env == 'packed':
+        from sliding_packed import State
+    elif env == 'romania':
         from romania import State
-    elif args.env == 'graph':
+    elif env == 'graph':
         from graph   import State
     else:
+        return None
+    return State
+
+#**********************************************************************
+#  Run one search, as specified by the command-line arguments.
+#
+def run( args ):
+    State = get_state_class(args.env)
+    if State is None:
         print('Unknown Environment:',args.env)
-        exit(1)
+        sys.exit(1)
+
+    if hasattr(State,'set_heuristic'):
+        State.set_heuristic(args.heuristic,args.pdb_dir)
+    elif args.heuristic != 'manhattan':
+        print('Unknown Heuristic:',args.heuristic)
+        sys.exit(1)
 
     start_state = State.start_state(args)
 
@@ -55,20 +107,44 @@ def main():
     print('Start:',end='')
     start_state.print_state()
     print()
+    if args.s in BIDIRECTIONAL:
+        bidirectional(start_state,args)
+        return
     start = Node(start_state,None,None,0,0,args.s,args.w)
     num_expand = 0
     solved = False
 
-    if args.s == 'dfs' and not args.id:  # non-iterative depth first search
-        num_expand = search(start,args,1000000,num_expand)
+    if args.s == 'idastar':              # iterative deepening A*
+        goal, iterations = idastar(start,args)
+        for (threshold,expanded) in iterations:
+            print('threshold:',threshold,'expanded:',expanded)
+        num_expand = sum(expanded for (threshold,expanded) in iterations)
+        if goal is None:
+            print('No solution found.')
+        else:
+            print_solution(goal,num_expand)
+
+    elif args.s == 'dfs' and not args.id:  # non-iterative depth first search
+        best_g = {start_state.key(): 0} if args.graph else None
+        num_expand = search(start,args,1000000,num_expand,best_g)
 
     elif( args.id ):                     # iterative deepening search
         for max_cost in range(2,1000000,2):
             print('limit:',max_cost)
-            num_expand = search(start,args,max_cost,num_expand)
+            best_g = {start_state.key(): 0} if args.graph else None
+            num_expand = search(start,args,max_cost,num_expand,best_g)
     else:
-        heap = MyHeap(args.s)
-        heap.insert(start)
+        # In graph search mode, best_g maps the key of every state reached
+        # to the lowest path cost it was reached at (see path_cost); it is
+        # the closed set as well. A queued node reached again more cheaply
+        # is replaced in the heap (decrease-key), so none is ever stale.
+        heap = IndexedHeap()
+        best_g = None
+        if args.graph:
+            best_g = {start_state.key(): 0}
+            heap.insert(start,start_state.key())
+        else:
+            heap.insert(start)
         while heap.size > 0 and not solved:
             num_expand += 1
             node = heap.remove_min()
@@ -80,45 +156,197 @@ def main():
                 solved = True
                 print_solution(node,num_expand)
             else:
-                generate_and_expand(node,args,0,num_expand,heap)
+                generate_and_expand(node,args,0,num_expand,heap,best_g)
+
+#**********************************************************************
+#  Iterative deepening A*. Each iteration is a depth-first search,
+#  driven by an explicit stack, of the nodes whose f = g + h is within
+#  the threshold; the next threshold is the smallest f that exceeded
+#  it, starting from h of the start state. A child whose state is that
+#  of its grandparent (undoing the last move) is not generated.
+#  Return (goal node or None, [(threshold, nodes expanded), ...]).
+#
+def idastar( start, args ):
+    iterations = []
+    threshold = start.cost
+    while True:
+        expanded = 1
+        next_threshold = None
+        if args.v:
+            start.print_node_ghf(args,args.unique)
+        if start.state.is_goal():
+            iterations.append((threshold,expanded))
+            return start, iterations
+        stack = [(start,iter(start.state.expand()),None)]
+        while stack:
+            node, children, parent_key = stack[-1]
+            child = next(children,None)
+            if child is None:
+                stack.pop()
+                continue
+            (state,act,cost) = child
+            if parent_key is not None and state.key() == parent_key:
+                continue
+            child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
+            if child.cost > threshold:
+                if next_threshold is None or child.cost < next_threshold:
+                    next_threshold = child.cost
+                continue
+            expanded += 1
+            if args.v:
+                child.print_node_ghf(args,args.unique)
+            if state.is_goal():
+                iterations.append((threshold,expanded))
+                return child, iterations
+            children = state.expand()
+            if args.shuffle:
+                random.shuffle(children)
+            stack.append((child,iter(children),node.state.key()))
+        iterations.append((threshold,expanded))
+        if next_threshold is None:
+            return None, iterations
+        threshold = next_threshold
+
+#**********************************************************************
+#  Bidirectional graph search: one search forward from the start and
+#  one backward from the goal (every environment here is reversible,
+#  with the same cost both ways), each expanding its cheapest node by
+#  the rule of BIDIRECTIONAL[args.s], the side with fewer queued nodes
+#  first. Whenever a side reaches a state the other has reached, the
+#  joined path is the best so far if its cost mu is the lowest. The
+#  search stops once no cheaper path can remain: for bfs and ucs, when
+#  the smallest path costs queued on the two sides sum to at least mu;
+#  for astar, when the smallest f on either side is at least mu. The
+#  backward side estimates the cost to the start with heuristic_to, if
+#  the environment has it (front-to-end), and with 0 otherwise. If
+#  the environment's heuristic estimates the distance to some other
+#  goal than the one chosen (heuristic_fits), both sides use 0.
+#
+def bidirectional( start_state, args ):
+    strategy = BIDIRECTIONAL[args.s]
+    goal_state = start_state.goal_for()
+    informed = not hasattr(start_state,'heuristic_fits') or start_state.heuristic_fits()
+    estimate = informed and hasattr(goal_state,'heuristic_to')
+    nodes = ({}, {})       # key -> best node, forward and backward
+    heaps = (IndexedHeap(), IndexedHeap())
+    expanded = [0, 0]
+    best = None            # (mu, forward node, backward node)
+
+    def add( side, node ):
+        nonlocal best
+        key = node.state.key()
+        if side == 0 and strategy == 'astar' and not informed:
+            node.cost = node.g
+        if side == 1 and strategy == 'astar':
+            node.cost = node.g + (node.state.heuristic_to(start_state) if estimate else 0)
+        nodes[side][key] = node
+        heaps[side].insert(node,key)
+        other = nodes[1-side].get(key)
+        if other is not None:
+            mu = path_cost(args,node.depth+other.depth,node.g+other.g)
+            if best is None or mu < best[0]:
+                best = (mu,) + ((node,other) if side == 0 else (other,node))
+
+    name, args.s = args.s, strategy    # path_cost and Node measure paths as this strategy does
+    try:
+        add(0,Node(start_state,None,None,0,0,strategy,args.w))
+        add(1,Node(goal_state,None,None,0,0,strategy,args.w))
+        while heaps[0].size > 0 and heaps[1].size > 0:
+            top = [heaps[side].a[0][0] for side in (0,1)]
+            if best is not None:
+                if strategy == 'astar' and max(top) >= best[0]:
+                    break
+                if strategy != 'astar' and top[0] + top[1] >= best[0]:
+                    break
+            side = 0 if heaps[0].size <= heaps[1].size else 1
+            node = heaps[side].remove_min()
+            expanded[side] += 1
+            if args.v:
+                print('<>'[side],end='')
+                node.print_node_ghf(args,args.unique)
+            for (state,act,cost) in node.state.expand():
+                g = path_cost(args,node.depth+1,node.g+cost)
+                previous = nodes[side].get(state.key())
+                if previous is not None and path_cost(args,previous.depth,previous.g) <= g:
+                    continue
+                add(side,Node(state,node,act,node.depth+1,node.g+cost,strategy,args.w))
+    finally:
+        args.s = name
+
+    if best is None:
+        print('No solution found.')
+        return
+    mu, forward, backward = best
+    forward.print_path()
+    while backward.parent is not None:
+        backward.state.print_action(backward.state.reverse_action(backward.action))
+        backward.parent.state.print_state()
+        backward = backward.parent
+    print('')
+    print('Generated:',Node.tick,end='.')
+    print(' Expanded:',expanded[0]+expanded[1],end='')
+    print(' (forward',expanded[0],end='')
+    print(', backward',expanded[1],end=').')
+    print(' Length:',forward.depth+best[2].depth,end='.')
+    print(' Cost:',forward.g+best[2].g,end='.')
+    print()
 
 #**********************************************************************
 #  Search recursively, until goal is reached or max_cost is exceeded.
 #  Return the total number of nodes expanded.
 #
-def search( node, args, max_cost, num_expand=0 ):
+def search( node, args, max_cost, num_expand=0, best_g=None ):
     num_expand += 1
     if args.v:
         node.print_node_ghf(args,args.unique)
     if( node.state.is_goal()):
         solved = True
         print_solution(node,num_expand)
-        exit(1)
+        sys.exit(1)
     else:
-        return generate_and_expand(node,args,max_cost,num_expand,None)
+        return generate_and_expand(node,args,max_cost,num_expand,None,best_g)
 
 #**********************************************************************
 #  Generate all children of the specified node, check for goal,
-#  and either add to heap or search recursively.
+#  and either add to heap or search recursively. With a best_g table
+#  (graph search), a child is dropped if its state has already been
+#  reached at no greater cost; otherwise, if it repeats an ancestor.
 #
-def generate_and_expand( node, args, max_cost=0, num_expand=0, heap=None ):
+def generate_and_expand( node, args, max_cost=0, num_expand=0, heap=None, best_g=None ):
     children = node.state.expand()
     if args.shuffle:
         random.shuffle(children)
     for (state,act,cost) in children:
+        key = None
         if args.s == 'bfs' and state.is_goal():
             child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
             print_solution(child,num_expand)
-            exit(1)
-        elif not ancestor_of(state,node):
-            child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
-            if args.id or args.s == 'dfs':     # search recursively
-                if child.cost <= max_cost:
-                    num_expand = search(child,args,max_cost,num_expand)
-            else:
-                heap.insert(child)
+            sys.exit(1)
+        if best_g is not None:
+            key = state.key()
+            g = path_cost(args,node.depth+1,node.g+cost)
+            if key in best_g and best_g[key] <= g:
+                continue
+            best_g[key] = g
+        elif ancestor_of(state,node):
+            continue
+        child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
+        if args.id or args.s == 'dfs':     # search recursively
+            if child.cost <= max_cost:
+                num_expand = search(child,args,max_cost,num_expand,best_g)
+        else:
+            heap.insert(child,key)
     return num_expand
                 
+#**********************************************************************
+#  Return the cost of a path as the strategy measures it, for graph
+#  search: its length for breadth- and depth-first search, else g.
+#
+def path_cost( args, depth, g ):
+    if args.s == 'bfs' or args.s == 'bfs1' or args.s == 'dfs':
+        return depth
+    return g
+
 #**********************************************************************
 #  Return True if state is an ancestor of node; False otherwise.
 #
@@ -140,6 +368,35 @@ def print_solution( node, num_expand ):
     print(' Cost:',node.g,end='.')
     print()
 
+#**********************************************************************
+#  Serve search requests from a long-lived process, so that the
+#  interpreter, NumPy and the environments are loaded only once.
+#  Each request is one line of JSON whose keys are the command-line
+#  options, e.g. {"env": "romania", "s": "ucs", "start": "dobreta"},
+#  and an optional "id" that is copied to the answer. Each answer is
+#  one line of JSON holding what the search printed ("output"), or an
+#  "error", and the time taken in seconds ("time"). Requests are read
+#  from stdin, or from connections to a Unix socket, one at a time.
+#
+def serve( socket_path=None ):
+    defaults = vars(make_parser().parse_args([]))
+    del defaults['serve'], defaults['socket']
+    goals = {}
+    for env in ENVIRONMENTS:
+        State = get_state_class(env)
+        if hasattr(State,'goal'):
+            goals[env] = State.goal
+
+    def handle(request):
+        args = line_server.request_options(request,defaults)
+        if args.env in goals:    # undo any goal set by an earlier request
+            get_state_class(args.env).set_goal(goals[args.env])
+        Node.tick = 0
+        Node.printed = set()
+        run(args)    # the search exits once it prints a solution
+
+    line_server.serve(handle,socket_path)
+
 
 if __name__ == '__main__':
     main()
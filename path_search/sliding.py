@@ -8,9 +8,41 @@
 
 import numpy as np
 import random
+import sys
+
+import pattern_db
+
+#**********************************************************************
+#  Return the pattern databases for the named heuristic, or None for
+#  the Manhattan distance. Shared with sliding_packed.py.
+#
+def load_heuristic(name,directory=None,partition='6-6-3'):
+    if name == 'manhattan':
+        return None
+    elif name == 'pdb':
+        try:
+            return pattern_db.load(directory,partition)
+        except FileNotFoundError as e:
+            print(e)
+            sys.exit(1)
+    else:
+        print('Unknown Heuristic:',name)
+        sys.exit(1)
+
+#**********************************************************************
+#  Return the database value of each pattern, for a board whose tile
+#  positions are packed in where (see pattern_db.where_of).
+#
+def pdb_parts(pdb,rows,cols,where):
+    if rows*cols != pattern_db.CELLS:
+        print('Pattern databases are only built for the 4x4 puzzle.')
+        sys.exit(1)
+    return pdb.parts(where)
 
 class State:
 
+    pdb = None   # pattern_db.AdditivePDB, or None for Manhattan distance
+
     def __init__(self,a,rows=3,cols=0):
         self.a = a
         self.rows = rows
@@ -53,9 +85,12 @@ class State:
                 col = 4
             else:
                 print('Scanned',len(list),'tiles.')
-                exit(1)
+                sys.exit(1)
             return(State(np.array(list),row,col))
 
+    def set_heuristic(name,directory=None,partition='6-6-3'):
+        State.pdb = load_heuristic(name,directory,partition)
+
     def goal_state(rows=3,cols=0):
         if cols == 0:
             cols = rows
@@ -65,6 +100,23 @@ class State:
 
     def is_equal_to(self,other):
         return(np.array_equal(self.a, other.a))
+
+    def key(self):
+        return self.a.tobytes()
+
+    def goal_for(self):
+        return State.goal_state(self.rows,self.cols)
+
+    def reverse_action(self,action):
+        return {'down':'up','up':'down','left':'right','right':'left'}[action]
+
+    def heuristic_to(self,other):
+        c = self.cols
+        where = np.empty(len(other.a),dtype=int)
+        where[other.a] = np.arange(len(other.a))
+        j = np.nonzero(self.a)[0]
+        k = where[self.a[j]]
+        return int(np.sum(abs(k%c - j%c) + abs(k//c - j//c)))
     
     def expand( self ):
         children = []
@@ -106,7 +158,9 @@ class State:
         return True
 
     def heuristic( self ):
-        return self.man_dist()
+        if State.pdb is None:
+            return self.man_dist()
+        return sum(pdb_parts(State.pdb,self.rows,self.cols,pattern_db.where_of(self.a)))
         
     def man_dist( self ):
         r = self.rows
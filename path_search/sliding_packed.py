@@ -0,0 +1,183 @@
+#**********************************************************************
+#   sliding_packed.py
+#
+#   The sliding tile puzzle as in sliding.py, with each state packed
+#   into one integer (4 bits per tile, position k in bits 4k..4k+3),
+#   so that equality and hashing are O(1). The position of the blank
+#   is kept, and the Manhattan distance of a child is updated from
+#   the one tile that moved, using tables built once per board shape.
+#   With --heuristic pdb, the additive pattern databases of
+#   pattern_db.py are used instead, and only the pattern of the tile
+#   that moved is looked up again.
+#   Select it with --env packed; it prints exactly as sliding.py.
+#   As each tile and position takes 4 bits, boards are limited to
+#   MAX_CELLS cells (up to 4x4).
+
+import sys
+
+import pattern_db
+import sliding
+
+MAX_CELLS = 16
+
+# (rows, cols) -> Layout, built on first use
+layouts = {}
+
+class Layout:
+
+    def __init__(self,rows,cols):
+        n = rows*cols
+        # dist[t][k]: Manhattan distance of tile t at position k
+        self.dist = [[0]*n for t in range(n)]
+        for t in range(1,n):
+            for k in range(n):
+                self.dist[t][k] = abs((t-1)%cols - k%cols) + abs((t-1)//cols - k//cols)
+        # moves[k]: (new blank position, action) for the blank at k,
+        # in the order of sliding.State.expand
+        self.moves = []
+        for k in range(n):
+            moves = []
+            if k < (rows-1)*cols:
+                moves.append((k+cols,'down'))
+            if k % cols < cols-1:
+                moves.append((k+1,'right'))
+            if k % cols > 0:
+                moves.append((k-1,'left'))
+            if k >= cols:
+                moves.append((k-cols,'up'))
+            self.moves.append(moves)
+        self.goal = pack(list(range(1,n)) + [0])
+        # apart[j][k]: Manhattan distance between positions j and k
+        self.apart = [[abs(j%cols - k%cols) + abs(j//cols - k//cols) for k in range(n)]
+                      for j in range(n)]
+
+def get_layout(rows,cols):
+    if (rows,cols) not in layouts:
+        layouts[(rows,cols)] = Layout(rows,cols)
+    return layouts[(rows,cols)]
+
+def check_size(rows,cols):
+    if rows*cols > MAX_CELLS:
+        print('Packed states hold at most',MAX_CELLS,'cells, not',
+              str(rows)+'x'+str(cols)+'; use --env sliding.')
+        sys.exit(1)
+
+def pack(tiles):
+    board = 0
+    for k, t in enumerate(tiles):
+        board |= int(t) << (4*k)
+    return board
+
+class State:
+
+    __slots__ = ('board','blank','rows','cols','h','layout','where','parts')
+
+    pdb = None   # pattern_db.AdditivePDB, or None for Manhattan distance
+
+    def __init__(self,board,blank,rows,cols):
+        self.board = board
+        self.blank = blank
+        self.rows = rows
+        self.cols = cols
+        self.layout = get_layout(rows,cols)
+        self.where = pattern_db.where_of([self.tile(k) for k in range(rows*cols)])
+        self.parts = None
+        self.h = self.heuristic()
+
+    def set_heuristic(name,directory=None,partition='6-6-3'):
+        State.pdb = sliding.load_heuristic(name,directory,partition)
+
+    def from_array(a,rows,cols):
+        check_size(rows,cols)
+        a = [int(t) for t in a]
+        return State(pack(a),a.index(0),rows,cols)
+
+    def start_state(args):
+        if args.start is None:
+            check_size(args.rows,args.cols if args.cols > 0 else args.rows)
+        start = sliding.State.start_state(args)
+        return State.from_array(start.a,start.rows,start.cols)
+
+    def goal_state(rows=3,cols=0):
+        goal = sliding.State.goal_state(rows,cols)
+        return State.from_array(goal.a,goal.rows,goal.cols)
+
+    def tile(self,k):
+        return (self.board >> (4*k)) & 15
+
+    def is_equal_to(self,other):
+        return self.board == other.board
+
+    def key(self):
+        return self.board
+
+    def goal_for(self):
+        return State.goal_state(self.rows,self.cols)
+
+    def reverse_action(self,action):
+        return sliding.State.reverse_action(self,action)
+
+    def heuristic_to(self,other):
+        apart = self.layout.apart
+        return sum(apart[(self.where >> (4*t)) & 15][(other.where >> (4*t)) & 15]
+                   for t in range(1,self.rows*self.cols))
+
+    def __eq__(self,other):
+        return isinstance(other,State) and self.board == other.board
+
+    def __hash__(self):
+        return hash(self.board)
+
+    def expand( self ):
+        children = []
+        board = self.board
+        blank = self.blank
+        dist = self.layout.dist
+        pdb = State.pdb
+        for (k,act) in self.layout.moves[blank]:
+            t = (board >> (4*k)) & 15
+            child = State.__new__(State)
+            child.board = board ^ (t << (4*k)) ^ (t << (4*blank))
+            child.blank = k
+            child.rows = self.rows
+            child.cols = self.cols
+            child.layout = self.layout
+            child.where = self.where ^ (k ^ blank) ^ ((k ^ blank) << (4*t))
+            if pdb is None:
+                child.parts = None
+                child.h = self.h - dist[t][k] + dist[t][blank]
+            else:
+                p = pdb.pattern_of[t]
+                part = pdb.part(p,child.where)
+                child.parts = list(self.parts)
+                child.parts[p] = part
+                child.h = self.h - self.parts[p] + part
+            children.append((child,act,1))
+        return children
+
+    def is_goal( self ):
+        return self.board == self.layout.goal
+
+    def heuristic( self ):
+        if State.pdb is None:
+            return self.man_dist()
+        self.parts = sliding.pdb_parts(State.pdb,self.rows,self.cols,self.where)
+        return sum(self.parts)
+
+    def man_dist( self ):
+        dist = self.layout.dist
+        return sum(dist[self.tile(k)][k] for k in range(self.rows*self.cols))
+
+    def print_action(self,action):
+        print(' (',action,')')
+
+    def print_state(self):
+        print('|',end='')
+        for i in range(self.rows):
+            for j in range(self.cols):
+                k = self.tile((i*self.cols) + j)
+                if k < 10:
+                    print(k,end='')
+                else:
+                    print(chr(k+55),end='')
+            print('|',end='')
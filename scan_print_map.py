@@ -1,42 +1,89 @@
 #************************************************************
 #   scan_print_map.py
 #   Scan a hashi puzzle from stdin, store it in a numpy array,
-#   and print it out again.
+#   and print it out again. With --multi, scan and print every
+#   puzzle in the input; puzzles are separated by blank lines.
 #
 import numpy as np
 import sys
 
+# Value of each byte in a puzzle: '0'-'9' and 'a'-'z' are islands,
+# '.' is water, and -1 marks characters that are skipped
+CELL_VALUE = np.full(256, -1, dtype=np.int32)
+CELL_VALUE[ord('0'):ord('9')+1] = np.arange(10)
+CELL_VALUE[ord('a'):ord('z')+1] = np.arange(10, 36)
+CELL_VALUE[ord('.')] = 0
+
 def main():
     code = ".123456789abc"
-    nrow, ncol, map = scan_map()
-    for r in range(nrow):
-        for c in range(ncol):
-            print(code[map[r][c]],end="")
-        print()
-        
-def scan_map():
-    text = []
-    for line in sys.stdin:
-        row = []
-        for ch in line:
-            n = ord(ch)
-            if n >= 48 and n <= 57:    # between '0' and '9'
-                row.append(n - 48)
-            elif n >= 97 and n <= 122: # between 'a' and 'z'
-                row.append(n - 87)
-            elif ch == '.':
-                row.append(0)
-        text.append(row)
-
-    nrow = len(text)
-    ncol = len(text[0])
-
-    map = np.zeros((nrow,ncol),dtype=np.int32)
-    for r in range(nrow):
-        for c in range(ncol):
-            map[r,c] = text[r][c]
-    
-    return nrow, ncol, map
+    if '--multi' in sys.argv[1:]:
+        puzzles = scan_maps()
+    else:
+        puzzles = [scan_map()]
+    for k, (nrow, ncol, map) in enumerate(puzzles):
+        if k > 0:
+            print()
+        for r in range(nrow):
+            for c in range(ncol):
+                print(code[map[r][c]],end="")
+            print()
+
+def scan_map(stream=None):
+    if stream is None:
+        stream = sys.stdin
+    return parse_map(read_bytes(stream))
+
+def scan_maps(stream=None):
+    """
+    Yields (nrow, ncol, map) for each puzzle in the stream, where puzzles
+    are separated by one or more blank lines, so that a whole corpus can
+    be read from one file or pipe.
+    """
+    if stream is None:
+        stream = sys.stdin
+    stream = getattr(stream, 'buffer', stream)
+    lines = []
+    for line in stream:
+        if isinstance(line, str):
+            line = line.encode()
+        if line.strip():
+            lines.append(line)
+        elif lines:
+            yield parse_map(b''.join(lines))
+            lines = []
+    if lines:
+        yield parse_map(b''.join(lines))
+
+def read_bytes(stream):
+    """
+    Reads the whole of a text or binary stream as bytes.
+    """
+    data = getattr(stream, 'buffer', stream).read()
+    if isinstance(data, str):
+        data = data.encode()
+    return data
+
+def parse_map(data):
+    """
+    Converts the bytes of one puzzle into (nrow, ncol, map). Every byte is
+    mapped through CELL_VALUE at once; lines without any cells are ignored.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    values = CELL_VALUE[buf]
+    line = np.cumsum(buf == ord('\n'))
+    is_cell = values >= 0
+    cells = values[is_cell]
+
+    counts = np.bincount(line[is_cell]) if len(cells) else np.zeros(0, dtype=np.int64)
+    counts = counts[counts > 0]
+    if len(counts) == 0:
+        raise ValueError('empty puzzle')
+    if np.any(counts != counts[0]):
+        raise ValueError('puzzle rows have different lengths')
+
+    nrow = len(counts)
+    ncol = int(counts[0])
+    return nrow, ncol, cells.reshape(nrow, ncol)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+#************************************************************
+#   serve_latency.py
+#   Compare the latency of answering requests through the
+#   command line (a fresh interpreter per request) with the
+#   --serve mode of path_search/search.py and hashi_solver.py
+#   (one long-lived process answering JSON lines):
+#
+#   python3 serve_latency.py                      path search requests
+#   python3 serve_latency.py puzzles/*.in         and these hashi puzzles
+#
+#   For each request the median over --repeat runs is printed,
+#   in milliseconds: the command line, the round trip to the
+#   server, and the time the server spent in the request itself.
+#
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEARCH = os.path.join(HERE, 'path_search', 'search.py')
+HASHI = os.path.join(HERE, 'hashi_solver.py')
+
+# Path search requests, as command-line options
+SEARCH_REQUESTS = [
+    {'env': 'romania', 's': 'ucs', 'start': 'dobreta', 'goal': 'fagaras'},
+    {'env': 'romania', 's': 'astar'},
+    {'env': 'graph', 's': 'astar'},
+    {'env': 'sliding', 'start': 'tutorial', 's': 'astar'},
+]
+
+def command_line(options):
+    """
+    Converts request options into command-line arguments.
+    """
+    argv = []
+    for key, value in options.items():
+        flag = '--' + key.replace('_', '-')
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv += [flag, str(value)]
+    return argv
+
+def time_cli(script, options, stdin, repeat):
+    """
+    Returns the median wall time of running the script once per request.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script] + command_line(options), input=stdin,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=os.path.dirname(script))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def time_server(server, request, repeat):
+    """
+    Returns the median round trip of a request to a running server, and the
+    median time the server reported spending on it.
+    """
+    round_trips = []
+    inside = []
+    line = (json.dumps(request) + '\n').encode()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        server.stdin.write(line)
+        server.stdin.flush()
+        response = json.loads(server.stdout.readline())
+        round_trips.append(time.perf_counter() - start)
+        inside.append(response['time'])
+    return statistics.median(round_trips), statistics.median(inside)
+
+def start_server(script):
+    return subprocess.Popen([sys.executable, script, '--serve'], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, cwd=os.path.dirname(script))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('puzzles',nargs='*',
+                        help='hashi puzzle files to add to the requests')
+    parser.add_argument('--repeat',type=int,default=10,
+                        help='runs of each request')
+    args = parser.parse_args()
+
+    rows = []
+    server = start_server(SEARCH)
+    for options in SEARCH_REQUESTS:
+        cli = time_cli(SEARCH, options, None, args.repeat)
+        round_trip, inside = time_server(server, options, args.repeat)
+        rows.append((' '.join(command_line(options)), cli, round_trip, inside))
+    server.stdin.close()
+    server.wait()
+
+    if args.puzzles:
+        server = start_server(HASHI)
+        for name in args.puzzles:
+            with open(name) as f:
+                puzzle = f.read()
+            cli = time_cli(HASHI, {}, puzzle.encode(), args.repeat)
+            round_trip, inside = time_server(server, {'puzzle': puzzle}, args.repeat)
+            rows.append(('hashi ' + os.path.basename(name), cli, round_trip, inside))
+        server.stdin.close()
+        server.wait()
+
+    print('%-52s %10s %10s %10s %8s' % ('request', 'cli ms', 'server ms', 'inside ms', 'speedup'))
+    for name, cli, round_trip, inside in rows:
+        print('%-52s %10.2f %10.2f %10.2f %7.1fx'
+              % (name, 1000 * cli, 1000 * round_trip, 1000 * inside, cli / round_trip))
+
+if __name__ == '__main__':
+    main()